@@ -0,0 +1,141 @@
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dotenv import load_dotenv
+from multidict import CIMultiDict
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+import asyncio
+import os
+import random
+
+from data_models import HomePageData, Tender, TenderDetailPage
+from detail_page_scrape import parse_tender_page
+from home_page_scrape import parse_home_page
+from parse_pool import process_context
+from http_client import HTTP_BACKOFF_FACTOR, HTTP_BACKOFF_JITTER, HTTP_CONNECT_TIMEOUT, HTTP_MAX_RETRIES, HTTP_READ_TIMEOUT, RETRY_STATUS_CODES
+import http_client
+import page_cache
+
+load_dotenv()
+
+# --- Configuration ---
+# Requests in flight at the same time across all hosts
+ASYNC_MAX_IN_FLIGHT = int(os.getenv("ASYNC_MAX_IN_FLIGHT") or 200)
+ASYNC_PER_HOST = int(os.getenv("ASYNC_PER_HOST") or 16)
+# Parsing runs off the event loop: in threads by default, or in this many processes when > 0
+ASYNC_PARSE_PROCESSES = int(os.getenv("ASYNC_PARSE_PROCESSES") or 0)
+ASYNC_PARSE_THREADS = int(os.getenv("ASYNC_PARSE_THREADS") or 4)
+
+class RetryableStatus(Exception):
+    pass
+
+def build_parse_executor() -> Executor:
+    if ASYNC_PARSE_PROCESSES > 0:
+        return ProcessPoolExecutor(max_workers=ASYNC_PARSE_PROCESSES, mp_context=process_context())
+    return ThreadPoolExecutor(max_workers=ASYNC_PARSE_THREADS, thread_name_prefix="parse")
+
+def build_session() -> aiohttp.ClientSession:
+    """Async counterpart of http_client.session: pooled keep-alive connections, gzip and timeouts."""
+    connector = aiohttp.TCPConnector(limit=ASYNC_MAX_IN_FLIGHT, limit_per_host=ASYNC_PER_HOST)
+    timeout = aiohttp.ClientTimeout(sock_connect=HTTP_CONNECT_TIMEOUT, sock_read=HTTP_READ_TIMEOUT)
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=timeout,
+        headers={"Accept-Encoding": "gzip, deflate"},
+        auto_decompress=True
+    )
+
+async def fetch(session: aiohttp.ClientSession, url: str, headers: Optional[Dict[str, str]] = None) -> Tuple[int, CIMultiDict, bytes]:
+    """
+    GETs a URL, retrying connection errors and 429/5xx with the same jittered
+    exponential backoff as http_client.
+
+    Returns:
+        The status code, the response headers and the body.
+    """
+    attempt = 0
+    while True:
+        http_client.increment("requests")
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status in RETRY_STATUS_CODES:
+                    raise RetryableStatus(f"{response.status} for {url}")
+                response.raise_for_status()
+                body = await response.read()
+                http_client.increment("bytes_received", len(body))
+                # A case-insensitive copy, page_cache looks up ETag and Last-Modified by their canonical names
+                return response.status, CIMultiDict(response.headers), body
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError, RetryableStatus):
+            attempt += 1
+            if attempt > HTTP_MAX_RETRIES:
+                raise
+            http_client.increment("retries")
+            await asyncio.sleep(HTTP_BACKOFF_FACTOR * 2 ** (attempt - 1) + random.uniform(0, HTTP_BACKOFF_JITTER))
+
+async def scrape_page_async(session: aiohttp.ClientSession, url: str, executor: Optional[Executor] = None) -> HomePageData:
+    """Async variant of home_page_scrape.scrape_page."""
+    _, _, body = await fetch(session, url)
+    return await asyncio.get_running_loop().run_in_executor(executor, parse_home_page, body)
+
+async def scrape_tender_async(session: aiohttp.ClientSession, tender_link: str, executor: Optional[Executor] = None) -> TenderDetailPage:
+    """Async variant of detail_page_scrape.scrape_tender, sharing its page cache."""
+    loop = asyncio.get_running_loop()
+    entry = page_cache.load(tender_link)
+    if entry and page_cache.is_fresh(entry):
+        page_cache.increment("hits")
+        return entry.page
+
+    print("Scraping tender: " + tender_link)
+    status, headers, body = await fetch(session, tender_link, page_cache.conditional_headers(entry))
+    if entry and status == 304:
+        page_cache.increment("revalidated")
+        return page_cache.refresh(tender_link, entry).page
+
+    page_cache.increment("misses")
+    details = await loop.run_in_executor(executor, parse_tender_page, body)
+    # Writing the entry touches the disk, keep that off the loop as well
+    await loop.run_in_executor(None, page_cache.store, tender_link, details, headers, body)
+    return details
+
+async def scrape_digest_async(link: str) -> Tuple[HomePageData, Dict[str, dict]]:
+    """
+    Scrapes the digest home page and every tender detail page on one event loop.
+
+    Tender.details is filled in place and tenders that failed are removed from
+    their query table, exactly like the scrape stage of pipeline.run_pipeline.
+
+    Returns:
+        The home page and the removed tenders keyed by tender_id.
+    """
+    executor = build_parse_executor()
+    try:
+        async with build_session() as session:
+            homepage = await scrape_page_async(session, link, executor)
+            tenders: List[Tender] = [tender for query_table in homepage.query_table for tender in query_table.tenders]
+            print(f"Scraping {len(tenders)} tenders asynchronously ({ASYNC_MAX_IN_FLIGHT} in flight, {ASYNC_PER_HOST} per host)...")
+            results = await asyncio.gather(
+                *(scrape_tender_async(session, tender.tender_url, executor) for tender in tenders),
+                return_exceptions=True
+            )
+    finally:
+        executor.shutdown(wait=False)
+
+    removed_tenders: Dict[str, dict] = {}
+    failed_ids = set()
+    query_names = {id(tender): query_table.query_name for query_table in homepage.query_table for tender in query_table.tenders}
+    for tender, result in zip(tenders, results):
+        if isinstance(result, BaseException):
+            print("Error: " + str(result))
+            failed_ids.add(id(tender))
+            # The queries that listed it, see pipeline.run_pipeline
+            removed = removed_tenders.setdefault(tender.tender_id, dict(tender.model_dump(mode="json"), query_names=[]))
+            removed["query_names"].append(query_names[id(tender)])
+        else:
+            tender.details = result
+
+    if failed_ids:
+        for query_table in homepage.query_table:
+            query_table.tenders = [tender for tender in query_table.tenders if id(tender) not in failed_ids]
+
+    print(f"✅ Scraped {len(tenders) - len(failed_ids)}/{len(tenders)} tenders.")
+    return homepage, removed_tenders
@@ -0,0 +1,255 @@
+from datetime import date, timedelta
+from typing import Callable, List
+
+import json
+import os
+import tempfile
+import time
+
+from compiled_template import render_email
+from data_models import HomePageData, Tender, TenderDetailOtherDetail, TenderDetailPage, TenderDetailPageFile
+from detail_page_scrape import parse_tender_page, parse_tender_page_json, scrape_tender_soup
+from fixtures import load_fixture_pages
+from home_page_scrape import parse_home_page
+from parquet_export import export_digest, scan_tenders
+from parse_pool import PARSE_WORKERS, ParsePool
+from parser_backend import PARSER_BACKENDS, make_soup
+from templater import generate_email
+
+def time_it(function: Callable[[], object], repeat: int) -> float:
+    """Returns the best time in seconds of `repeat` runs of function."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark_parsers(repeat: int = 5):
+    # Parses every saved page with every parser backend
+    pages = load_fixture_pages()
+    if not pages:
+        raise Exception("No saved pages found, see fixtures.py")
+
+    def parse_all(backend: str):
+        for _, kind, content in pages:
+            if kind == "home":
+                parse_home_page(content, backend)
+            else:
+                parse_tender_page(content, backend)
+
+    print(f"Parsing {len(pages)} saved pages, best of {repeat}:")
+    baseline = None
+    for backend in PARSER_BACKENDS:
+        seconds = time_it(lambda: parse_all(backend), repeat)
+        baseline = baseline or seconds
+        print(f"  {backend:<12} {seconds * 1000:8.1f} ms  ({baseline / seconds:.1f}x)")
+
+def benchmark_tender_parse(repeat: int = 5):
+    # Per-tender cost of parse_tender_page, split into building the tree and reading the tables
+    pages = [content for _, kind, content in load_fixture_pages() if kind == "detail"]
+    if not pages:
+        raise Exception("No saved detail pages found, see fixtures.py")
+
+    print(f"Parsing {len(pages)} saved detail pages, best of {repeat}:")
+    for backend in PARSER_BACKENDS:
+        tree = time_it(lambda: [make_soup(content, backend) for content in pages], repeat)
+        soups = [make_soup(content, backend) for content in pages]
+        tables = time_it(lambda: [scrape_tender_soup(soup) for soup in soups], repeat)
+        tree_ms = tree / len(pages) * 1000
+        tables_ms = tables / len(pages) * 1000
+        print(f"  {backend:<12} {tree_ms + tables_ms:6.2f} ms/tender  (tree {tree_ms:6.2f} ms, tables {tables_ms:6.3f} ms)")
+
+def benchmark_subtree_parse(repeat: int = 5):
+    # Whole-page parsing against parsing only the subtree the scrapers read
+    pages = load_fixture_pages()
+    if not pages:
+        raise Exception("No saved pages found, see fixtures.py")
+
+    def parse_all(backend: str, subtree: bool):
+        for _, kind, content in pages:
+            if kind == "home":
+                parse_home_page(content, backend, subtree=subtree)
+            else:
+                parse_tender_page(content, backend, subtree=subtree)
+
+    print(f"Parsing {len(pages)} saved pages, best of {repeat}:")
+    for backend in PARSER_BACKENDS:
+        full = time_it(lambda: parse_all(backend, False), repeat)
+        subtree = time_it(lambda: parse_all(backend, True), repeat)
+        print(f"  {backend:<12} full {full * 1000:8.1f} ms, subtree {subtree * 1000:8.1f} ms  ({full / subtree:.1f}x)")
+
+def benchmark_parse_scaling(page_count: int = 500):
+    # Detail page throughput in this process against ParsePool with more and more workers
+    saved = [content for _, kind, content in load_fixture_pages() if kind == "detail"]
+    if not saved:
+        raise Exception("No saved detail pages found, see fixtures.py")
+    # Saved pages are repeated until there are page_count of them
+    pages = [saved[i % len(saved)] for i in range(page_count)]
+
+    start = time.perf_counter()
+    for content in pages:
+        parse_tender_page(content)
+    baseline = len(pages) / (time.perf_counter() - start)
+    print(f"Parsing {len(pages)} detail pages ({len(saved)} distinct) on {PARSE_WORKERS} cores:")
+    print(f"  in process    {baseline:8.1f} pages/s")
+
+    counts: List[int] = []
+    workers = 1
+    while workers < PARSE_WORKERS:
+        counts.append(workers)
+        workers *= 2
+    counts.append(PARSE_WORKERS)
+    for workers in counts:
+        pool = ParsePool(workers)
+        try:
+            # Start every worker before timing
+            list(pool.executor.map(parse_tender_page_json, saved[:workers]))
+            start = time.perf_counter()
+            for serialized in pool.executor.map(parse_tender_page_json, pages, chunksize=8):
+                TenderDetailPage.model_validate_json(serialized)
+            throughput = len(pages) / (time.perf_counter() - start)
+        finally:
+            pool.shutdown()
+        print(f"  {workers:>3} processes {throughput:8.1f} pages/s  ({throughput / baseline:.1f}x)")
+
+def benchmark_render(tender_counts: List[int] = [100, 1000, 5000], legacy_limit: int = 1000):
+    # generate_email against the compiled template as the digest grows
+    homes = [content for _, kind, content in load_fixture_pages() if kind == "home"]
+    if not homes:
+        raise Exception("No saved home pages found, see fixtures.py")
+    home = parse_home_page(homes[0])
+    saved = [tender for query in home.query_table for tender in query.tenders]
+
+    print(f"Rendering the digest of {len(saved)} saved tenders, grown to:")
+    for count in tender_counts:
+        # The saved query tables, with their tenders repeated until there are `count` of them
+        data = home.model_copy(deep=True)
+        per_query = max(1, count // len(data.query_table))
+        for query in data.query_table:
+            query.tenders = [saved[i % len(saved)] for i in range(per_query)]
+
+        compiled = time_it(lambda: render_email(data), 3)
+        line = f"  {count:>6} tenders  compiled {compiled * 1000:9.1f} ms ({compiled / count * 1e6:6.1f} us/tender)"
+        if count <= legacy_limit:
+            legacy = time_it(lambda: generate_email(data), 1)
+            line += f"  generate_email {legacy * 1000:9.1f} ms ({legacy / compiled:.0f}x)"
+        print(line)
+
+def construct_tender(data: dict) -> Tender:
+    """Tender.model_validate(data) without validation, with model_construct all the way down."""
+    details = data["details"]
+    if details:
+        fields = TenderDetailPage.model_fields
+        details = TenderDetailPage.model_construct(**{
+            name: fields[name].annotation.model_construct(**value)
+            for name, value in details.items() if name != "other_detail"
+        }, other_detail=TenderDetailOtherDetail.model_construct(
+            information_source=details["other_detail"]["information_source"],
+            files=[TenderDetailPageFile.model_construct(**file) for file in details["other_detail"]["files"]]
+        ))
+    return Tender.model_construct(**{**data, "details": details})
+
+def benchmark_models(tender_count: int = 10000):
+    # Building and dumping pydantic models, per tender_count tenders
+    pages = load_fixture_pages()
+    homes = [content for _, kind, content in pages if kind == "home"]
+    details = [parse_tender_page(content) for _, kind, content in pages if kind == "detail"]
+    if not homes or not details:
+        raise Exception("Saved home and detail pages are needed, see fixtures.py")
+    saved = [tender for query in parse_home_page(homes[0]).query_table for tender in query.tenders]
+    tenders: List[Tender] = []
+    for i in range(tender_count):
+        tender = saved[i % len(saved)].model_copy()
+        tender.details = details[i % len(details)]
+        tenders.append(tender)
+    dumped = [tender.model_dump() for tender in tenders]
+
+    print(f"{tender_count} tenders with details, best of 3:")
+    rows = [
+        ("construct: Tender.model_validate", lambda: [Tender.model_validate(data) for data in dumped]),
+        ("construct: Tender.model_construct", lambda: [construct_tender(data) for data in dumped]),
+        ("dump: json.loads(model_dump_json)", lambda: [json.loads(tender.model_dump_json(indent=2)) for tender in tenders]),
+        ("dump: model_dump(mode='json')", lambda: [tender.model_dump(mode='json') for tender in tenders]),
+    ]
+    for name, function in rows:
+        seconds = time_it(function, 3)
+        print(f"  {name:<38} {seconds * 1000:9.1f} ms ({seconds / tender_count * 1e6:6.1f} us/tender)")
+
+def benchmark_parquet_scan(digest_count: int = 365, tenders_per_digest: int = 200):
+    # Scans of a year of daily digests exported to Parquet, built from the saved pages
+    pages = load_fixture_pages()
+    homes = [content for _, kind, content in pages if kind == "home"]
+    details = [parse_tender_page(content) for _, kind, content in pages if kind == "detail"]
+    if not homes or not details:
+        raise Exception("Saved home and detail pages are needed, see fixtures.py")
+    home = parse_home_page(homes[0])
+    saved = [tender for query in home.query_table for tender in query.tenders]
+    states = ["Maharashtra", "Gujarat", "Karnataka", "Tamil Nadu", "Uttar Pradesh", "Rajasthan"]
+    first_day = date(2025, 1, 1)
+
+    with tempfile.TemporaryDirectory() as export_dir:
+        start = time.perf_counter()
+        for day in range(digest_count):
+            digest_date = first_day + timedelta(days=day)
+            tenders = []
+            for i in range(tenders_per_digest):
+                tender = saved[i % len(saved)].model_copy()
+                page = details[i % len(details)]
+                tender.details = page.model_copy(update={"notice": page.notice.model_copy(update={"state": states[(day + i) % len(states)]})})
+                tender.value_rupees = (day * tenders_per_digest + i) * 1000
+                tenders.append(tender)
+            query = home.query_table[0].model_copy(update={"tenders": tenders})
+            digest = home.model_copy(update={
+                "header": home.header.model_copy(update={"date": digest_date.strftime("%A, %b %d,%Y")}),
+                "query_table": [query],
+            })
+            export_digest(digest, f"digest-{day}", export_dir)
+        seconds = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(export_dir) for name in names)
+        print(f"{digest_count} digests of {tenders_per_digest} tenders exported in {seconds:.1f} s, {size / 1024 / 1024:.1f} MB on disk")
+
+        columns = ["digest_date", "tender_id", "state", "value_rupees"]
+        rows = [
+            ("everything, all columns", lambda: scan_tenders(export_dir=export_dir)),
+            ("everything, 4 columns", lambda: scan_tenders(columns=columns, export_dir=export_dir)),
+            ("state", lambda: scan_tenders(state="Gujarat", columns=columns, export_dir=export_dir)),
+            ("value range", lambda: scan_tenders(min_value=10_000_000, max_value=20_000_000, columns=columns, export_dir=export_dir)),
+            ("one month", lambda: scan_tenders(date_from=date(2025, 3, 1), date_to=date(2025, 3, 31), columns=columns, export_dir=export_dir)),
+            ("state, value and month", lambda: scan_tenders(state="Gujarat", min_value=10_000_000, date_from=date(2025, 3, 1), date_to=date(2025, 3, 31), columns=columns, export_dir=export_dir)),
+        ]
+        print("Scans, best of 3:")
+        for name, function in rows:
+            row_count = function().num_rows
+            seconds = time_it(function, 3)
+            print(f"  {name:<26} {seconds * 1000:8.1f} ms {row_count:>8} rows")
+
+def main():
+    print("Choose a benchmark:")
+    print("1. Parser backends")
+    print("2. Per-tender parse cost")
+    print("3. Whole page against subtree parsing")
+    print("4. Process pool scaling")
+    print("5. Email rendering")
+    print("6. Pydantic model construction and dumping")
+    print("7. Parquet export scans")
+    choice = input("Enter your choice: ")
+    if choice == "1":
+        benchmark_parsers()
+    elif choice == "2":
+        benchmark_tender_parse()
+    elif choice == "3":
+        benchmark_subtree_parse()
+    elif choice == "4":
+        benchmark_parse_scaling()
+    elif choice == "5":
+        benchmark_render()
+    elif choice == "6":
+        benchmark_models()
+    elif choice == "7":
+        benchmark_parquet_scan()
+    else:
+        print("Invalid choice.")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,323 @@
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+from dotenv import load_dotenv
+from html import escape
+from pydantic import BaseModel
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+import functools
+import hashlib
+import os
+import premailer
+import re
+import threading
+
+from data_models import HomePageData, Tender
+from page_cache import write_atomic
+
+load_dotenv()
+
+# --- Configuration ---
+TEMPLATE_PATH = "./template.html"
+# premailer's results for each version of the template, see inline_template
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or "cache/templates"
+
+# premailer loads these relative to the working directory, like the scripts do
+STYLESHEET_LINK = re.compile(r'<link\b[^>]*\bhref=["\']([^"\']+\.css)["\']', re.IGNORECASE)
+
+# Surrounds the name of a slot in a compiled fragment. It can not appear in
+# template.html (the parser drops it from text), so splitting on it is safe.
+SLOT = "\x00"
+
+# A slot is filled with text, which is escaped, or with a function that yields
+# nested fragments (one per query, one per tender) as they are rendered.
+SlotValue = Union[str, Callable[[], Iterable[str]]]
+
+class Fragment:
+    """A serialized piece of the template: literal HTML around named slots."""
+    def __init__(self, html: str):
+        pieces = html.split(SLOT)
+        self.literals = pieces[0::2]
+        self.slots = pieces[1::2]
+
+    def render(self, values: Dict[str, SlotValue]) -> Iterator[str]:
+        """Yields the fragment piece by piece with its slots filled."""
+        for literal, slot in zip(self.literals, self.slots):
+            yield literal
+            value = values[slot]
+            if callable(value):
+                yield from value()
+            else:
+                yield escape(value)
+        yield self.literals[-1]
+
+class CompiledTemplate:
+    """
+    template.html with its CSS already inlined, cut into the four fragments
+    generate_email used to copy and fill for every query and tender:
+
+        document     the page, with the query rows and query tables slots
+        query_row    one row of the queries table
+        query_table  the table of one query, with a tender rows slot
+        tender_row   one tender
+    """
+    def __init__(self, document: Fragment, query_row: Fragment, query_table: Fragment, tender_row: Fragment):
+        self.document = document
+        self.query_row = query_row
+        self.query_table = query_table
+        self.tender_row = tender_row
+
+class InlinedTemplate(BaseModel):
+    """premailer's results for one version of the template, as stored in TEMPLATE_CACHE_DIR."""
+    template_hash: str
+    # Serialized fragments with their slots, by CompiledTemplate attribute
+    fragments: Dict[str, str]
+    # element_key -> attributes premailer adds to every element at that place in the template.
+    # None when elements at the same place got different styles, those need premailer.
+    style_map: Dict[str, Optional[Dict[str, str]]]
+    # The <style> blocks premailer leaves for the rules it can not inline (e.g. :nth-child)
+    stylesheet: str
+
+def find(parent: Tag, name: str, attrs: Dict[str, str]) -> Tag:
+    element = parent.find(name, attrs=attrs)
+    if not isinstance(element, Tag):
+        raise Exception(f"Template element {name} {attrs} not found")
+    return element
+
+def slot(name: str) -> str:
+    return SLOT + name + SLOT
+
+def cut(element: Tag, name: str) -> str:
+    """Takes a repeated element out of the template, leaving a slot where its copies go."""
+    fragment = str(element)
+    element.replace_with(slot(name))
+    return fragment
+
+def template_hash(path: str = TEMPLATE_PATH) -> str:
+    """Hash of the template and of every stylesheet it links to."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        template = f.read()
+    digest.update(template)
+    for href in STYLESHEET_LINK.findall(template.decode()):
+        with open(href, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def element_key(element: Tag) -> str:
+    """
+    Where an element sits in the template: the tag, id and classes of the
+    element and of all its ancestors. Copies of a template element share its
+    key, and type, class, id and descendant selectors can not tell them apart.
+    """
+    parts: List[str] = []
+    for node in [element, *element.parents]:
+        if node.name == "[document]":
+            break
+        classes = node.get('class') or []
+        parts.append(node.name + "#" + str(node.get('id') or "") + "".join("." + name for name in classes))
+    return " ".join(reversed(parts))
+
+def build_style_map(original: BeautifulSoup, inlined: BeautifulSoup) -> Dict[str, Optional[Dict[str, str]]]:
+    """Compares the template before and after premailer, element by element."""
+    original_elements = [element for element in original.find_all(True) if element.name not in ("link", "style")]
+    inlined_elements = [element for element in inlined.find_all(True) if element.name not in ("link", "style")]
+    if [element.name for element in original_elements] != [element.name for element in inlined_elements]:
+        # premailer changed the structure, leave every element to premailer
+        return {}
+
+    style_map: Dict[str, Optional[Dict[str, str]]] = {}
+    for before, after in zip(original_elements, inlined_elements):
+        added = {name: str(value) for name, value in after.attrs.items() if before.attrs.get(name) != value}
+        key = element_key(after)
+        if key in style_map and style_map[key] != added:
+            style_map[key] = None
+        else:
+            style_map.setdefault(key, added)
+    return style_map
+
+@functools.lru_cache(maxsize=None)
+def inline_template(path: str = TEMPLATE_PATH) -> InlinedTemplate:
+    """
+    Runs premailer on the template once per version of it. The result is
+    cached in TEMPLATE_CACHE_DIR under the hash of template.html and its
+    stylesheets, so later runs neither parse the CSS nor match a selector.
+
+    The template holds a single copy of every repeated element and no inlined
+    style depends on how many copies there are (:nth-child rules stay in the
+    <style> block), so inlining the template before the copies are made gives
+    the same styles as inlining the whole email.
+    """
+    key = template_hash(path)
+    cache_path = os.path.join(TEMPLATE_CACHE_DIR, key + ".json")
+    try:
+        with open(cache_path, 'r') as f:
+            return InlinedTemplate.model_validate_json(f.read())
+    except (OSError, ValueError):
+        pass
+
+    print("🗂️  Inlining the CSS of " + path + "...")
+    with open(path, 'r') as f:
+        template_html = f.read()
+    inlined = premailer.Premailer(allow_loading_external_files=True).transform(template_html)
+    soup = BeautifulSoup(inlined, 'html.parser')
+    style_map = build_style_map(BeautifulSoup(template_html, 'html.parser'), soup)
+    stylesheet = "".join(str(style) for style in soup.find_all('style'))
+
+    # Header section
+    find(soup, 'td', {'id': 'date'}).string = slot("date")
+    find(soup, 'td', {'id': 'contact'}).string = slot("contact")
+    find(soup, 'h4', {'id': 'name'}).string = slot("name")
+    find(soup, 'td', {'id': 'company'}).string = slot("company")
+    find(soup, 'span', {'id': 'no_of_new_tenders'}).string = slot("no_of_new_tenders")
+
+    # One row of the queries table per query
+    query_row_elem = find(find(soup, 'table', {'id': 'queries'}), 'tr', {'class': 'query_tender_row'})
+    find(query_row_elem, 'td', {'class': 'query_tender_row_query'}).string = slot("query_name")
+    find(query_row_elem, 'td', {'class': 'query_tender_row_no_of_tenders_found'}).string = slot("number_of_tenders")
+    query_row = cut(query_row_elem, "query_rows")
+
+    # One table per query, holding one row per tender
+    query_table_elem = find(find(soup, 'div', {'id': 'tenders'}), 'table', {})
+    find(query_table_elem, 'td', {'class': 'tender_query_table_tender_name'}).string = slot("query_name")
+    tender_row_elem = find(find(query_table_elem, 'tbody', {}), 'tr', {})
+    find(tender_row_elem, 'td', {'class': 'tender_table_tender_name_and_number'}).string = slot("tender_name")
+    find(tender_row_elem, 'td', {'class': 'tender_table_tender_city'}).string = slot("city")
+    find(tender_row_elem, 'td', {'class': 'tender_table_tender_summary'}).string = slot("summary")
+    find(tender_row_elem, 'span', {'class': 'tender_table_tender_value'}).string = slot("value")
+    find(tender_row_elem, 'span', {'class': 'tender_table_tender_due_date'}).string = slot("due_date")
+    find(tender_row_elem, 'a', {'class': 'tender_table_view_tender_link'})['href'] = slot("view_link")
+    find(tender_row_elem, 'a', {'class': 'tender_table_redirect_to_website'})['href'] = slot("chat_link")
+    tender_row = cut(tender_row_elem, "tender_rows")
+    query_table = cut(query_table_elem, "query_tables")
+
+    entry = InlinedTemplate(
+        template_hash=key,
+        fragments={
+            "document": str(soup),
+            "query_row": query_row,
+            "query_table": query_table,
+            "tender_row": tender_row,
+        },
+        style_map=style_map,
+        stylesheet=stylesheet
+    )
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        write_atomic(cache_path, entry.model_dump_json().encode())
+    except OSError as e:
+        print(f"⚠️  Could not cache the inlined template: {e}")
+    return entry
+
+@functools.lru_cache(maxsize=None)
+def compile_template(path: str = TEMPLATE_PATH) -> CompiledTemplate:
+    """The fragments of the inlined template, ready to render."""
+    fragments = inline_template(path).fragments
+    return CompiledTemplate(
+        Fragment(fragments["document"]),
+        Fragment(fragments["query_row"]),
+        Fragment(fragments["query_table"]),
+        Fragment(fragments["tender_row"])
+    )
+
+def apply_inline_styles(soup: BeautifulSoup, path: str = TEMPLATE_PATH) -> bool:
+    """
+    Inlines the CSS of a document built from the template (see templater.generate_email)
+    with the cached style map instead of premailer.
+
+    Returns:
+        False, leaving the document untouched, when it holds markup the template does not
+        (or an inline style premailer would have to merge), so it still needs premailer.
+    """
+    template = inline_template(path)
+    elements = [element for element in soup.find_all(True) if element.name not in ("link", "style")]
+    styles: List[Dict[str, str]] = []
+    for element in elements:
+        added = template.style_map.get(element_key(element))
+        if added is None or 'style' in element.attrs:
+            return False
+        styles.append(added)
+
+    for element, added in zip(elements, styles):
+        element.attrs.update(added)
+    links = [link for link in soup.find_all('link') if 'stylesheet' in (link.get('rel') or [])]
+    for index, link in enumerate(links):
+        if index == 0 and template.stylesheet:
+            link.replace_with(BeautifulSoup(template.stylesheet, 'html.parser'))
+        else:
+            link.decompose()
+    return True
+
+def render_tender_row_html(tender: Tender, template: Optional[CompiledTemplate] = None) -> str:
+    """String counterpart of templater.render_tender_row, used by the pipeline's render stage."""
+    return "".join(iter_tender_row(tender, template or compile_template()))
+
+def iter_tender_row(tender: Tender, template: CompiledTemplate) -> Iterator[str]:
+    return template.tender_row.render({
+        "tender_name": tender.tender_name,
+        "city": tender.city,
+        "summary": tender.summary,
+        "value": tender.value,
+        "due_date": tender.due_date,
+        "view_link": tender.drive_url or tender.tender_url,
+        "chat_link": f"http://3.6.93.207:3000/new-from-drive?driveUrl={tender.drive_url}",
+    })
+
+def iter_email(data: HomePageData, rendered_rows: Optional[Dict[str, str]] = None) -> Iterator[str]:
+    """
+    Yields the digest email piece by piece in one pass over HomePageData, with
+    the same content and inline styles as templater.generate_email.
+
+    rendered_rows can hold tender rows already rendered with render_tender_row_html,
+    keyed by tender_id. Tenders without one are rendered here.
+    """
+    template = compile_template()
+    rendered_rows = rendered_rows or {}
+
+    def query_rows() -> Iterator[str]:
+        for query in data.query_table:
+            yield from template.query_row.render({"query_name": query.query_name, "number_of_tenders": query.number_of_tenders})
+
+    def query_tables() -> Iterator[str]:
+        for query in data.query_table:
+            def tender_rows(query=query) -> Iterator[str]:
+                for tender in query.tenders:
+                    row = rendered_rows.get(tender.tender_id)
+                    if row is None:
+                        yield from iter_tender_row(tender, template)
+                    else:
+                        yield row
+            yield from template.query_table.render({"query_name": query.query_name, "tender_rows": tender_rows})
+
+    return template.document.render({
+        "date": data.header.date,
+        "contact": data.header.contact,
+        "name": data.header.name,
+        "company": data.header.company,
+        "no_of_new_tenders": data.header.no_of_new_tenders,
+        "query_rows": query_rows,
+        "query_tables": query_tables,
+    })
+
+def render_email(data: HomePageData, rendered_rows: Optional[Dict[str, str]] = None) -> str:
+    """The whole email as one string, see iter_email."""
+    return "".join(iter_email(data, rendered_rows))
+
+def write_email(data: HomePageData, rendered_rows: Optional[Dict[str, str]] = None, path: str = "email.html") -> bytes:
+    """
+    Renders the email exactly once: every piece is encoded a single time,
+    streamed to `path` as it is produced and kept for the message body.
+
+    Returns:
+        The UTF-8 body, the same bytes that were written to `path`.
+    """
+    body = bytearray()
+    # Per thread, digests rendered at the same time each write their own
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        for piece in iter_email(data, rendered_rows):
+            chunk = piece.encode()
+            f.write(chunk)
+            body += chunk
+    os.replace(temp_path, path)
+    return bytes(body)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -23,6 +23,10 @@ class TenderDetailNotice(BaseModel):
     tender_type: str
     bidding_type: str
     competition_type: str
+    # Amounts above in whole rupees, None when the page gives none, see field_parsers
+    document_fees_rupees: Optional[int] = None
+    emd_rupees: Optional[int] = None
+    tender_value_rupees: Optional[int] = None
 
 class TenderDetailDetails(BaseModel):
     tender_details: str
@@ -31,6 +35,10 @@ class TenderDetailKeyDates(BaseModel):
     publish_date: str
     last_date_of_bid_submission: str
     tender_opening_date: str
+    # Dates above parsed, None when the page gives none
+    publish_at: Optional[datetime] = None
+    last_date_of_bid_submission_at: Optional[datetime] = None
+    tender_opening_at: Optional[datetime] = None
 
 class TenderDetailContactInformation(BaseModel):
     company_name: str
@@ -66,6 +74,9 @@ class Tender(BaseModel):
     due_date: str
     # Details of the tender, could be undefined
     details: TenderDetailPage | None
+    # value in whole rupees and due_date parsed, None when they could not be
+    value_rupees: Optional[int] = None
+    due_at: Optional[datetime] = None
 
 class TenderQuery(BaseModel):
     query_name: str
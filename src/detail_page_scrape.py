@@ -1,56 +1,53 @@
-from typing import List, Optional
+from typing import Callable, List, Optional, Tuple
 from bs4 import BeautifulSoup
 from bs4.element import Tag
+
+import re
 import requests
 
 from data_models import TenderDetailContactInformation, TenderDetailDetails, TenderDetailKeyDates, TenderDetailNotice, TenderDetailOtherDetail, TenderDetailPage, TenderDetailPageFile
-
-def notice_table_helper(search: str, rows: List[Tag]) -> str:
-    for row in rows:
-        if search in row.text:
-            print("Row text: " + row.text)
-            return row.find_all('td')[1].text
-
-    return "N/A"
-
+from field_parsers import key_dates, notice_amounts
+from parser_backend import PARSE_SUBTREE, class_strainer, make_soup
+from table_index import FieldSpec, extract_fields
+import http_client
+import page_cache
+
+# Labels of the notice table, see table_index.FieldSpec.
+# Note that some of these rows will not exist on every tender.
+NOTICE_FIELDS: FieldSpec = {
+    "tdr": ["TDR"],
+    "tendering_authority": ["Tendering Authority"],
+    "tender_no": ["Tender No", "Tender Number"],
+    "tender_id": ["Tender ID"],
+    "tender_brief": ["Tender Brief"],
+    "city": ["City"],
+    "state": ["State"],
+    "document_fees": ["Document Fees", "Document Fee", "Tender Fee"],
+    "emd": ["EMD", "Earnest Money Deposit"],
+    "tender_value": ["Tender Value", "Estimated Value"],
+    "tender_type": ["Tender Type"],
+    "bidding_type": ["Bidding Type"],
+    "competition_type": ["Competition Type"],
+}
+
+KEY_DATES_FIELDS: FieldSpec = {
+    "publish_date": ["Publish Date", "Published Date"],
+    "last_date_of_bid_submission": ["Last Date of Bid Submission", "Bid Submission End Date"],
+    "tender_opening_date": ["Tender Opening Date", "Bid Opening Date"],
+}
+
+CONTACT_INFORMATION_FIELDS: FieldSpec = {
+    "company_name": ["Company Name"],
+    "contact_person": ["Contact Person"],
+    "address": ["Address"],
+}
 
 def scrape_notice_table(table: Tag) -> TenderDetailNotice:
     # up to 14 rows in the notice table
     # Row one is table name, Ignore
-    # Remaining rows are as follows:
-    # 1. TDR
-    # 2. Tendering Authority
-    # 3. Tender No
-    # 4. Tender ID
-    # 5. Tender Brief
-    # 6. City
-    # 7. State
-    # 8. Document Fees
-    # 9. EMD
-    # 10. Tender Value
-    # 11. Tender Type
-    # 12. Bidding Type
-    # 13. Competition Type
-    # Note that some of these will not exist. 
-    # we have to smartly find the ones that do exist
-    rows = table.find_all('tr')
-    rows = rows[1:]
-
-    return TenderDetailNotice(
-        tdr=notice_table_helper('TDR', rows),
-        tendering_authority=notice_table_helper('Tendering Authority', rows),
-        tender_no=notice_table_helper('Tender No', rows),
-        tender_id=notice_table_helper('Tender ID', rows),
-        tender_brief=notice_table_helper('Tender Brief', rows),
-        city=notice_table_helper('City', rows),
-        state=notice_table_helper('State', rows),
-        document_fees=notice_table_helper('Document Fees', rows),
-        emd=notice_table_helper('EMD', rows),
-        tender_value=notice_table_helper('Tender Value', rows),
-        tender_type=notice_table_helper('Tender Type', rows),
-        bidding_type=notice_table_helper('Bidding Type', rows),
-        competition_type=notice_table_helper('Competition Type', rows)
-    )
+    # Remaining rows are label/value pairs, see NOTICE_FIELDS
+    fields = extract_fields(table, NOTICE_FIELDS)
+    return TenderDetailNotice(**fields, **notice_amounts(fields))
 
 def scrape_details(table: Tag) -> TenderDetailDetails:
     # This table will have a paragraph that contains all the details
@@ -59,13 +56,6 @@ def scrape_details(table: Tag) -> TenderDetailDetails:
         raise Exception("Tender details table does not have a paragraph")
     return TenderDetailDetails(tender_details=p.text)
 
-def key_dates_helper(search: str, rows: List[Tag]) -> str:
-    for row in rows:
-        if search in row.text:
-            return row.find_all('td')[1].text
-
-    return "N/A"
-
 def scrape_key_dates(table: Tag) -> TenderDetailKeyDates:
     # This table has upto 4 rows:
     # 1. Table name
@@ -73,21 +63,8 @@ def scrape_key_dates(table: Tag) -> TenderDetailKeyDates:
     # 3. Last Date of Bid Submission
     # 4. Tender Opening Date
     # Note that some of these will not exist.
-    rows = table.find_all('tr')
-    rows = rows[1:]
-
-    return TenderDetailKeyDates(
-        publish_date=key_dates_helper('Publish Date', rows),
-        last_date_of_bid_submission=key_dates_helper('Last Date of Bid Submission', rows),
-        tender_opening_date=key_dates_helper('Tender Opening Date', rows)
-    )
-
-def contact_information_helper(search: str, rows: List[Tag]) -> str:
-    for row in rows:
-        if search in row.text:
-            return row.find_all('td')[1].text
-
-    return "N/A"
+    fields = extract_fields(table, KEY_DATES_FIELDS)
+    return TenderDetailKeyDates(**fields, **key_dates(fields))
 
 def scrape_contact_information(table: Tag) -> TenderDetailContactInformation:
     # This table has upto 4 rows:
@@ -96,14 +73,7 @@ def scrape_contact_information(table: Tag) -> TenderDetailContactInformation:
     # 3. Contact Person
     # 4. Address
     # Note that some of these will not exist.
-    rows = table.find_all('tr')
-    rows = rows[1:]
-
-    return TenderDetailContactInformation(
-        company_name=contact_information_helper('Company Name', rows),
-        contact_person=contact_information_helper('Contact Person', rows),
-        address=contact_information_helper('Address', rows)
-    )
+    return TenderDetailContactInformation(**extract_fields(table, CONTACT_INFORMATION_FIELDS))
 
 def scrape_other_details(table: Tag) -> TenderDetailOtherDetail:
     # This table has 4 rows:
@@ -155,10 +125,64 @@ def scrape_other_details(table: Tag) -> TenderDetailOtherDetail:
     )
 
 
-def scrape_tender(tender_link) -> TenderDetailPage:
+def fetch_tender(tender_link) -> Tuple[Optional[TenderDetailPage], Optional[requests.Response]]:
+    """
+    The network half of scrape_tender.
+
+    Fresh cache entries skip the network entirely. Stale ones are revalidated
+    with a conditional GET and reused as-is if the server answers 304.
+
+    Returns:
+        The cached page, or the response whose content still has to be parsed.
+    """
+    entry = page_cache.load(tender_link)
+    if entry and page_cache.is_fresh(entry):
+        page_cache.increment("hits")
+        return entry.page, None
+
     print("Scraping tender: " + tender_link)
-    page = requests.get(tender_link)
-    soup = BeautifulSoup(page.content, 'html.parser')
+    page = http_client.get(tender_link, headers=page_cache.conditional_headers(entry))
+    if entry and page.status_code == 304:
+        page_cache.increment("revalidated")
+        return page_cache.refresh(tender_link, entry).page, None
+
+    page_cache.increment("misses")
+    return None, page
+
+def scrape_tender(tender_link, parse: Optional[Callable[[bytes], TenderDetailPage]] = None) -> TenderDetailPage:
+    """
+    Returns the parsed detail page of a tender, from the page cache when possible.
+
+    Args:
+        tender_link: The detail page URL.
+        parse: Parses the raw page, parse_tender_page by default. See parse_pool.ParsePool.parse.
+    """
+    cached, page = fetch_tender(tender_link)
+    if cached:
+        return cached
+
+    details = (parse or parse_tender_page)(page.content)
+    page_cache.store(tender_link, details, page.headers, page.content)
+    return details
+
+# Everything scrape_tender_soup reads is inside the tender-details-home div
+TENDER_DETAILS_STRAINER = class_strainer('div', 'tender-details-home')
+TENDER_DETAILS_START = re.compile(rb'<div\b[^>]*\bclass\s*=\s*["\'][^"\']*\btender-details-home\b', re.IGNORECASE)
+
+def parse_tender_page(content: bytes, backend: Optional[str] = None, subtree: bool = PARSE_SUBTREE) -> TenderDetailPage:
+    if subtree:
+        try:
+            return scrape_tender_soup(make_soup(content, backend, TENDER_DETAILS_STRAINER, TENDER_DETAILS_START))
+        except Exception as e:
+            # The page does not look like it used to, read it whole so the error (if any) is the real one
+            print(f"⚠️  Subtree parse failed ({e}), parsing the whole page.")
+    return scrape_tender_soup(make_soup(content, backend))
+
+def parse_tender_page_json(content: bytes) -> str:
+    """parse_tender_page for worker processes: the page goes back to the parent as JSON."""
+    return parse_tender_page(content).model_dump_json()
+
+def scrape_tender_soup(soup: BeautifulSoup) -> TenderDetailPage:
 
     # Every tender page will have a tender-details-home class that contains all the content
     tender_details_home = soup.find('div', attrs={'class': 'tender-details-home'})
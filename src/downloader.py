@@ -0,0 +1,167 @@
+from dotenv import load_dotenv
+from requests import HTTPError
+from typing import Optional, Tuple
+
+import os
+import re
+import threading
+import time
+
+from data_models import TenderDetailPageFile
+import http_client
+
+load_dotenv()
+
+# --- Configuration ---
+# Number of attachments downloaded at the same time, across all tenders
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS") or 8)
+# Global bandwidth budget in bytes per second shared by all downloads. 0 means unlimited.
+DOWNLOAD_BANDWIDTH = int(os.getenv("DOWNLOAD_BANDWIDTH") or 0)
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE") or 256 * 1024)
+# How many times a download that broke off mid-stream is resumed before giving up
+DOWNLOAD_ATTEMPTS = int(os.getenv("DOWNLOAD_ATTEMPTS") or 3)
+
+# Sites disagree on whether a KB is 1000 or 1024 bytes, so both are accepted
+SIZE_EXPONENTS = {
+    "B": 0,
+    "BYTES": 0,
+    "KB": 1,
+    "MB": 2,
+    "GB": 3,
+}
+
+class BandwidthLimiter:
+    """
+    Token bucket shared by every download thread. Each chunk has to acquire
+    its size in tokens before it is written, so the combined throughput of all
+    downloads stays under `rate` bytes per second.
+    """
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount: int):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                # A chunk bigger than the bucket is let through once the bucket is full
+                needed = min(amount, self.rate)
+                if self.tokens >= needed:
+                    self.tokens -= needed
+                    return
+                wait = (needed - self.tokens) / self.rate
+            time.sleep(wait)
+
+def parse_file_size(file_size: str) -> Optional[Tuple[int, int]]:
+    """
+    Parses the size advertised on the tender page (e.g. "1.25 MB").
+
+    Returns:
+        The smallest and largest byte counts that would be displayed as the
+        advertised value, or None if the string could not be parsed.
+    """
+    match = re.search(r"([\d.,]+)\s*([KMG]?B|bytes)\b", file_size, re.IGNORECASE)
+    if not match:
+        return None
+    try:
+        number = float(match.group(1).replace(",", ""))
+    except ValueError:
+        return None
+    exponent = SIZE_EXPONENTS[match.group(2).upper()]
+
+    # "1.25 MB" can be anything that rounds to 1.25, so allow half of the last digit either way
+    decimals = len(match.group(1).split(".")[1]) if "." in match.group(1) else 0
+    rounding = 0.5 * 10 ** -decimals
+    low = (number - rounding) * 1000 ** exponent
+    high = (number + rounding) * 1024 ** exponent
+    return int(low), int(high) + 1
+
+def verify_file_size(file: TenderDetailPageFile, path: str, expected_length: Optional[int]):
+    actual = os.path.getsize(path)
+    if expected_length is not None and actual != expected_length:
+        raise Exception(f"Downloaded {actual} bytes of '{file.file_name}' but the server sent Content-Length {expected_length}")
+
+    advertised = parse_file_size(file.file_size)
+    if advertised:
+        low, high = advertised
+        if not low <= actual <= high:
+            raise Exception(f"Downloaded {actual} bytes of '{file.file_name}' but the page advertises {file.file_size.strip()}")
+
+def download_file(file: TenderDetailPageFile, file_path: str, limiter: Optional[BandwidthLimiter] = None) -> int:
+    """
+    Streams a tender attachment to disk without holding it in memory.
+
+    Data is written to `file_path + ".part"` and renamed once the size has been
+    verified. A .part file left over from an interrupted run is resumed with an
+    HTTP Range request.
+
+    Returns:
+        The size of the downloaded file in bytes.
+    """
+    part_path = file_path + ".part"
+    last_error: Optional[Exception] = None
+
+    for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else None
+        try:
+            response = http_client.get(file.file_url, stream=True, headers=headers)
+        except HTTPError as error:
+            # 416 means the .part file already holds the whole file
+            if offset and error.response is not None and error.response.status_code == 416:
+                verify_file_size(file, part_path, None)
+                os.replace(part_path, file_path)
+                return offset
+            raise
+
+        with response:
+            if offset and response.status_code == 206:
+                mode = "ab"
+                print(f"Resuming {file.file_name} from byte {offset}")
+            else:
+                # The server ignored the Range header, start over
+                mode = "wb"
+                offset = 0
+
+            content_length = response.headers.get("Content-Length")
+            expected_length = offset + int(content_length) if content_length and not response.headers.get("Content-Encoding") else None
+
+            try:
+                with open(part_path, mode) as f:
+                    for chunk in http_client.iter_content(response, DOWNLOAD_CHUNK_SIZE):
+                        if limiter:
+                            limiter.acquire(len(chunk))
+                        f.write(chunk)
+            except Exception as e:
+                # Keep the .part file, the next attempt picks up where this one stopped
+                last_error = e
+                print(f"⚠️  Download of {file.file_name} broke off (attempt {attempt}/{DOWNLOAD_ATTEMPTS}): {e}")
+                continue
+
+        try:
+            verify_file_size(file, part_path, expected_length)
+        except Exception:
+            os.remove(part_path)
+            raise
+        os.replace(part_path, file_path)
+        return os.path.getsize(file_path)
+
+    raise Exception(f"Failed to download '{file.file_name}' after {DOWNLOAD_ATTEMPTS} attempts: {last_error}")
+
+def download_one(job: Tuple[TenderDetailPageFile, str], limiter: Optional[BandwidthLimiter]) -> Optional[Exception]:
+    file, file_path = job
+    if os.path.exists(file_path):
+        return None
+    print("Downloading file " + file.file_name + " to " + file_path)
+    try:
+        download_file(file, file_path, limiter)
+        return None
+    except Exception as e:
+        print(f"Error downloading {file.file_name}: {e}")
+        return e
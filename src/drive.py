@@ -1,22 +1,22 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-from dateutil import parser
+from googleapiclient.http import HttpRequest
 
 import os
-import mimetypes
-import requests
 
-from data_models import HomePageData
-from detail_page_scrape import scrape_tender
+from drive_upload import list_local_files, upload_file
+from drive_index import DriveIndex, DriveTenderFolder
+from field_parsers import parse_datetime
 
 # Google drive setup
 SCOPES = ['https://www.googleapis.com/auth/drive']
 creds = None
+# Drive accepts at most 100 sub-requests per batch request
+DRIVE_BATCH_SIZE = 100
 
 def parse_date(date_string: str) -> str:
     """
@@ -26,23 +26,17 @@ def parse_date(date_string: str) -> str:
         date_string: The date string to parse (e.g., "Sunday, Oct 12,2025").
 
     Returns:
-        The formatted date string 'YYYY-MM-DD', or None if parsing fails.
+        The formatted date string 'YYYY-MM-DD', or "unknown-date" if parsing fails.
     """
     if not date_string:
         return "unknown-date"
 
-    try:
-        # 1. Let dateutil parse the string into a datetime object.
-        # It handles missing spaces and other variations automatically.
-        date_object = parser.parse(date_string)
-
-        # 2. Format the object into the desired "YYYY-MM-DD" string.
-        formatted_string = date_object.strftime("%Y-%m-%d")
-        return formatted_string
-
-    except parser.ParserError:
+    # The site's formats are matched directly, anything else falls back to dateutil
+    date_object = parse_datetime(date_string)
+    if not date_object:
         print(f"⚠️  Warning: Could not parse the date string '{date_string}'.")
         return "unknown-date"
+    return date_object.strftime("%Y-%m-%d")
 
 def find_folder(service, folder_name, parent_folder_id=None):
     """Finds a folder by name and optional parent ID."""
@@ -61,73 +55,33 @@ def find_folder(service, folder_name, parent_folder_id=None):
         print(f"An error occurred finding a folder: {error}")
         return None
 
-def is_folder_empty(service, folder_id):
-    """Checks if a Google Drive folder is empty."""
-    try:
-        query = f"'{folder_id}' in parents and trashed=false"
-        response = service.files().list(q=query, spaces='drive', fields='files(id)', pageSize=1).execute()
-        items = response.get('files', [])
-        return len(items) == 0
-    except HttpError as error:
-        print(f"An error occurred checking if folder is empty: {error}")
-        return False # Assume not empty on error
-
-def download_folders(data: HomePageData):
-    date = parse_date(data.header.date)
-    os.system("rm -rf tenders/" + date)
-    os.system("mkdir -p tenders/" + date)
-
-    service = authenticate_google_drive()
-    if not service:
-        return
+def resolve_date_folder(service, index: DriveIndex, date: str) -> Optional[str]:
+    """Returns the id of the Drive folder for a digest date, creating it if needed."""
+    date_folder_id = index.date_folder_id(date)
+    if date_folder_id:
+        # One cheap call to make sure nobody deleted the folder since it was indexed
+        try:
+            folder = service.files().get(fileId=date_folder_id, fields='id, trashed').execute()
+            if not folder.get('trashed'):
+                return date_folder_id
+        except HttpError as error:
+            print(f"Indexed folder '{date}' is no longer available: {error}")
 
     # Check if the date folder exists
     date_folder = find_folder(service, date)
     if date_folder:
         date_folder_id = date_folder.get('id')
-        if not is_folder_empty(service, date_folder_id):
-            print(f"Folder '{date}' already exists and is not empty.")
-        else:
-            print(f"Folder '{date}' already exists and is empty.")
+        print(f"Folder '{date}' already exists.")
     else:
         # Upload the "date" folder to Google Drive and get the folder id
-        date_folder_id = upload_folder_to_drive(service, "tenders/" + date)
-
-    for query_table in data.query_table:
-        for tender in query_table.tenders:
-            try:
-                tender_folder = find_folder(service, tender.tender_id, date_folder_id)
-                if tender_folder:
-                    tender_folder_id = tender_folder.get('id')
-                    if not is_folder_empty(service, tender_folder_id):
-                        print(f"Folder '{tender.tender_id}' already exists and is not empty. Skipping download.")
-                        tender.drive_url = get_shareable_link(service, tender_folder_id)
-                        continue
-
-                if not tender.details:
-                    tender.details = scrape_tender(tender.tender_url)
-                    raise Exception("Tender details not found")
-                # Create a folder for each tender
-                folder_path = "tenders/" + date + "/" + tender.tender_id
-                os.system("mkdir -p " + folder_path)
-                for file in tender.details.other_detail.files:
-                    file_path = folder_path + "/" + file.file_name
-                    if not os.path.exists(file_path):
-                        # Download the file
-                        print("Downloading file " + file.file_name + " to " + file_path)
-                        with open(file_path, 'wb') as f:
-                            f.write(requests.get(file.file_url).content)
-
-                # Upload the tender folder to Google Drive and get the folder id
-                tender_folder_id = upload_folder_to_drive(service, folder_path, date_folder_id)
-                # Get the shareable link for the tender folder
-                tender.drive_url = get_shareable_link(service, tender_folder_id)
-            except Exception as e:
-                print("Error: " + str(e))
-                query_table.tenders.remove(tender)
-
-def authenticate_google_drive():
-    """Authenticates with the Google Drive API and returns a service object."""
+        date_folder_id = upload_folder_to_drive(service, "tenders/" + date, check_existing=False)
+
+    if date_folder_id:
+        index.set_date_folder(date, date_folder_id)
+    return date_folder_id
+
+def load_credentials():
+    """Loads the Google Drive credentials, running the login flow if needed."""
     creds = None
     # The file token.json stores the user's access and refresh tokens.
     # It's created automatically when the authorization flow completes for the first time.
@@ -146,7 +100,14 @@ def authenticate_google_drive():
         # Save the credentials for the next run
         with open('token.json', 'w') as token:
             token.write(creds.to_json())
-            
+
+    return creds
+
+def authenticate_google_drive(creds=None):
+    """Authenticates with the Google Drive API and returns a service object."""
+    if not creds:
+        creds = load_credentials()
+
     try:
         service = build('drive', 'v3', credentials=creds)
         print("✅ Google Drive API Authentication Successful!")
@@ -155,18 +116,19 @@ def authenticate_google_drive():
         print(f"An error occurred during authentication: {error}")
         return None
 
-def upload_folder_to_drive(service, local_folder_path, parent_folder_id=None) -> Optional[str]:
+def upload_folder_to_drive(service, local_folder_path, parent_folder_id=None, check_existing=True) -> Optional[str]:
     """Uploads a local folder and its contents to Google Drive.
-    Checks if the folder already exists before uploading."""
+    Checks if the folder already exists before uploading, unless the caller already knows it doesn't."""
     folder_name = os.path.basename(local_folder_path)
 
     try:
         # Check if folder already exists
-        existing_folder = find_folder(service, folder_name, parent_folder_id)
-        if existing_folder:
-            folder_id = existing_folder.get('id')
-            print(f"\nFolder '{folder_name}' already exists with ID: {folder_id}. Skipping upload.")
-            return folder_id
+        if check_existing:
+            existing_folder = find_folder(service, folder_name, parent_folder_id)
+            if existing_folder:
+                folder_id = existing_folder.get('id')
+                print(f"\nFolder '{folder_name}' already exists with ID: {folder_id}. Skipping upload.")
+                return folder_id
 
         print(f"\nUploading folder '{folder_name}' to Google Drive...")
 
@@ -183,24 +145,89 @@ def upload_folder_to_drive(service, local_folder_path, parent_folder_id=None) ->
         print(f"  - Created Google Drive folder with ID: {gdrive_folder_id}")
 
         # 2. Upload files into the created folder
-        for item in os.listdir(local_folder_path):
-            item_path = os.path.join(local_folder_path, item)
-            if os.path.isfile(item_path):
-                # Guess the MIME type of the file
-                mimetype, _ = mimetypes.guess_type(item_path)
-                file_metadata = {
-                    'name': item,
-                    'parents': [gdrive_folder_id]
-                }
-                media = MediaFileUpload(item_path, mimetype=mimetype)
-                service.files().create(body=file_metadata, media_body=media, fields='id').execute()
-                print(f"    - Uploaded file: {item}")
-        
+        upload_files_to_folder(service, local_folder_path, gdrive_folder_id)
+
         return gdrive_folder_id
     except HttpError as error:
         print(f"An error occurred uploading the folder: {error}")
         return None
 
+def upload_files_to_folder(service, local_folder_path, gdrive_folder_id) -> int:
+    """Uploads every file of a local folder into an existing Google Drive folder, one after another.
+    Returns the number of files uploaded."""
+    uploaded = 0
+    for item_path in list_local_files(local_folder_path):
+        upload_file(service, item_path, gdrive_folder_id)
+        uploaded += 1
+    return uploaded
+
+def execute_batch(service, requests: List[Tuple[str, HttpRequest]]) -> Dict[str, Tuple[Optional[dict], Optional[Exception]]]:
+    """
+    Runs Drive API requests as HTTP batch requests of up to DRIVE_BATCH_SIZE sub-requests.
+
+    Args:
+        requests: (request_id, request) pairs. Request ids must be unique.
+
+    Returns:
+        (response, error) for every request id. Exactly one of the two is set.
+    """
+    results: Dict[str, Tuple[Optional[dict], Optional[Exception]]] = {}
+
+    def callback(request_id, response, exception):
+        results[request_id] = (response, exception)
+
+    for start in range(0, len(requests), DRIVE_BATCH_SIZE):
+        chunk = requests[start:start + DRIVE_BATCH_SIZE]
+        batch = service.new_batch_http_request(callback=callback)
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id)
+        try:
+            batch.execute()
+        except Exception as error:
+            # The whole batch failed to go through, every request in it failed
+            print(f"An error occurred executing a batch request: {error}")
+            for request_id, _ in chunk:
+                results.setdefault(request_id, (None, error))
+    return results
+
+def share_folders(service, folders: Dict[str, DriveTenderFolder]) -> Dict[str, Optional[str]]:
+    """
+    Makes many folders public with batch requests and returns their shareable links.
+
+    Folders already marked as shared are not touched. A folder whose permission
+    grant or metadata fetch failed maps to None, without affecting the others.
+    """
+    permission = {
+        'type': 'anyone',
+        'role': 'reader'
+    }
+    unshared = {key: folder for key, folder in folders.items() if not folder.shared}
+    granted = execute_batch(service, [
+        (key, service.permissions().create(fileId=folder.id, body=permission))
+        for key, folder in unshared.items()
+    ])
+    for key, (_, error) in granted.items():
+        if error:
+            print(f"An error occurred while sharing folder '{key}': {error}")
+        else:
+            unshared[key].shared = True
+
+    # Folders created or listed through the index normally already carry their webViewLink
+    without_link = {key: folder for key, folder in folders.items() if folder.shared and not folder.web_view_link}
+    fetched = execute_batch(service, [
+        (key, service.files().get(fileId=folder.id, fields='webViewLink'))
+        for key, folder in without_link.items()
+    ])
+    for key, (response, error) in fetched.items():
+        if error or not response:
+            print(f"An error occurred while getting the shareable link of '{key}': {error}")
+        else:
+            without_link[key].web_view_link = response.get('webViewLink')
+
+    links = {key: folder.web_view_link if folder.shared else None for key, folder in folders.items()}
+    print(f"  - Generated {sum(1 for link in links.values() if link)}/{len(folders)} shareable links")
+    return links
+
 def get_shareable_link(service, folder_id):
     """Makes a folder public and returns its shareable link."""
     try:
@@ -0,0 +1,146 @@
+from dotenv import load_dotenv
+from googleapiclient.errors import HttpError
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+import os
+import threading
+
+load_dotenv()
+
+DRIVE_INDEX_PATH = os.getenv("DRIVE_INDEX_PATH") or "drive_index.json"
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+# Drive rejects very long queries, so parent ids are OR-ed together in groups of this size
+PARENTS_PER_QUERY = 40
+
+class DriveTenderFolder(BaseModel):
+    id: str
+    file_count: int
+    web_view_link: str | None
+    # Whether the "anyone with the link" permission has been granted
+    shared: bool = False
+
+class DriveDateFolder(BaseModel):
+    id: str
+    tenders: Dict[str, DriveTenderFolder]
+
+class DriveIndexData(BaseModel):
+    dates: Dict[str, DriveDateFolder]
+
+def list_files(service, query: str, fields: str) -> List[dict]:
+    """Runs a files().list query and follows nextPageToken until every page has been read."""
+    files: List[dict] = []
+    page_token = None
+    while True:
+        response = service.files().list(
+            q=query,
+            spaces='drive',
+            fields=f"nextPageToken, files({fields})",
+            pageSize=1000,
+            pageToken=page_token
+        ).execute()
+        files.extend(response.get('files', []))
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return files
+
+class DriveIndex:
+    """
+    Local copy of the date folder -> tender folder layout on Google Drive.
+
+    The index is refreshed from one paged listing per date folder and then
+    updated as folders are created, filled and shared, so the per-tender
+    existence checks and link lookups never leave the machine.
+    """
+    def __init__(self, path: str = DRIVE_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Held for a whole save, so the last state dumped is the last one written
+        self.save_lock = threading.Lock()
+        self.data = DriveIndexData(dates={})
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.data = DriveIndexData.model_validate_json(f.read())
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable Drive index {path}: {e}")
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                content = self.data.model_dump_json(indent=2)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                f.write(content)
+            os.replace(temp_path, self.path)
+
+    def date_folder_id(self, date: str) -> Optional[str]:
+        with self.lock:
+            date_folder = self.data.dates.get(date)
+            return date_folder.id if date_folder else None
+
+    def set_date_folder(self, date: str, folder_id: str):
+        with self.lock:
+            existing = self.data.dates.get(date)
+            if not existing or existing.id != folder_id:
+                self.data.dates[date] = DriveDateFolder(id=folder_id, tenders={})
+
+    def sync_date_folder(self, service, date: str, date_folder_id: str) -> bool:
+        """
+        Rebuilds the tender folders of a date folder from Drive.
+
+        One paged listing returns every tender folder with its webViewLink, and one
+        more paged listing per PARENTS_PER_QUERY folders returns their files, which
+        gives the file counts. Sharing state is carried over for folders that kept their id.
+
+        Returns:
+            False if Drive could not be listed, in which case the index is left untouched.
+        """
+        try:
+            children = list_files(
+                service,
+                f"'{date_folder_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false",
+                "id, name, webViewLink"
+            )
+            file_counts: Dict[str, int] = {child['id']: 0 for child in children}
+            folder_ids = list(file_counts)
+            for start in range(0, len(folder_ids), PARENTS_PER_QUERY):
+                parents = " or ".join(f"'{folder_id}' in parents" for folder_id in folder_ids[start:start + PARENTS_PER_QUERY])
+                for file in list_files(service, f"({parents}) and trashed=false", "id, parents"):
+                    for parent in file.get('parents', []):
+                        if parent in file_counts:
+                            file_counts[parent] += 1
+        except HttpError as error:
+            print(f"An error occurred listing folder '{date}': {error}")
+            return False
+
+        with self.lock:
+            previous = self.data.dates.get(date)
+            previous_tenders = previous.tenders if previous and previous.id == date_folder_id else {}
+            tenders: Dict[str, DriveTenderFolder] = {}
+            for child in children:
+                known = previous_tenders.get(child['name'])
+                tenders[child['name']] = DriveTenderFolder(
+                    id=child['id'],
+                    file_count=file_counts[child['id']],
+                    web_view_link=child.get('webViewLink'),
+                    shared=bool(known and known.id == child['id'] and known.shared)
+                )
+            self.data.dates[date] = DriveDateFolder(id=date_folder_id, tenders=tenders)
+
+        print(f"🗂️  Indexed {len(children)} tender folders under '{date}'.")
+        return True
+
+    def get_tender(self, date: str, tender_id: str) -> Optional[DriveTenderFolder]:
+        with self.lock:
+            date_folder = self.data.dates.get(date)
+            if not date_folder:
+                return None
+            return date_folder.tenders.get(tender_id)
+
+    def record_tender(self, date: str, tender_id: str, folder: DriveTenderFolder):
+        with self.lock:
+            date_folder = self.data.dates.get(date)
+            if not date_folder:
+                raise Exception(f"Date folder '{date}' is not in the Drive index")
+            date_folder.tenders[tender_id] = folder
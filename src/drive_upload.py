@@ -0,0 +1,118 @@
+from dotenv import load_dotenv
+from email.utils import parsedate_to_datetime
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+from typing import List, Optional
+
+import mimetypes
+import os
+import random
+import threading
+import time
+
+load_dotenv()
+
+# --- Configuration ---
+# Files uploaded at the same time. Each worker thread gets its own Drive service.
+DRIVE_UPLOAD_WORKERS = int(os.getenv("DRIVE_UPLOAD_WORKERS") or 4)
+# Files at least this big are sent as a resumable upload in chunks of DRIVE_UPLOAD_CHUNK_SIZE
+DRIVE_RESUMABLE_THRESHOLD = int(os.getenv("DRIVE_RESUMABLE_THRESHOLD") or 5 * 1024 * 1024)
+# Must be a multiple of 256 KB
+DRIVE_UPLOAD_CHUNK_SIZE = int(os.getenv("DRIVE_UPLOAD_CHUNK_SIZE") or 8 * 1024 * 1024)
+DRIVE_UPLOAD_RETRIES = int(os.getenv("DRIVE_UPLOAD_RETRIES") or 5)
+
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+def retry_delay(error: HttpError, attempt: int) -> float:
+    """Seconds to wait before retrying, taken from Retry-After when the server sent one."""
+    retry_after = error.resp.get('retry-after') if error.resp else None
+    if retry_after:
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    # Jittered exponential backoff
+    return min(60.0, 2 ** attempt) + random.uniform(0, 1)
+
+def is_retryable(error: HttpError) -> bool:
+    return error.resp is not None and error.resp.status in RETRY_STATUS_CODES
+
+def find_file(service, file_name: str, parent_folder_id: str) -> Optional[str]:
+    """The id of the file with this name in a Google Drive folder, or None."""
+    escaped = file_name.replace("\\", "\\\\").replace("'", "\\'")
+    response = service.files().list(
+        q=f"name='{escaped}' and '{parent_folder_id}' in parents and trashed=false",
+        spaces='drive',
+        fields='files(id)',
+        pageSize=1
+    ).execute()
+    files = response.get('files', [])
+    return files[0]['id'] if files else None
+
+def upload_file(service, file_path: str, parent_folder_id: str, file_id: Optional[str] = None) -> str:
+    """
+    Uploads one file into a Google Drive folder and returns the new file id.
+    With `file_id`, the content of that existing file is replaced instead.
+
+    Large files use a resumable upload so a failed chunk is retried from the
+    last byte Drive confirmed instead of from the start. 429 and 5xx responses
+    are retried after the Retry-After delay, or with exponential backoff.
+    """
+    file_name = os.path.basename(file_path)
+    # Guess the MIME type of the file
+    mimetype, _ = mimetypes.guess_type(file_path)
+    file_metadata = {
+        'name': file_name,
+        'parents': [parent_folder_id]
+    }
+    resumable = os.path.getsize(file_path) >= DRIVE_RESUMABLE_THRESHOLD
+    if resumable:
+        media = MediaFileUpload(file_path, mimetype=mimetype, resumable=True, chunksize=DRIVE_UPLOAD_CHUNK_SIZE)
+    else:
+        media = MediaFileUpload(file_path, mimetype=mimetype)
+    if file_id:
+        request = service.files().update(fileId=file_id, media_body=media, fields='id')
+    else:
+        request = service.files().create(body=file_metadata, media_body=media, fields='id')
+
+    attempt = 0
+    response = None
+    while response is None:
+        try:
+            if resumable:
+                _, response = request.next_chunk()
+            else:
+                response = request.execute()
+        except HttpError as error:
+            attempt += 1
+            if not is_retryable(error) or attempt > DRIVE_UPLOAD_RETRIES:
+                raise
+            delay = retry_delay(error, attempt)
+            print(f"    - Upload of {file_name} got {error.resp.status}, retrying in {delay:.1f}s ({attempt}/{DRIVE_UPLOAD_RETRIES})")
+            time.sleep(delay)
+
+    print(f"    - {'Replaced' if file_id else 'Uploaded'} file: {file_name}")
+    return response.get('id')
+
+def list_local_files(local_folder_path: str) -> List[str]:
+    """Files of a local tender folder, leaving out partial downloads."""
+    paths = [os.path.join(local_folder_path, item) for item in sorted(os.listdir(local_folder_path)) if not item.endswith(".part")]
+    return [path for path in paths if os.path.isfile(path)]
+
+class ThreadServices:
+    """
+    The Drive client is not thread safe, so every thread that talks to Drive
+    gets its own service object, built lazily from the shared credentials.
+    """
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.local = threading.local()
+
+    def get(self):
+        if not hasattr(self.local, 'service'):
+            self.local.service = build('drive', 'v3', credentials=self.credentials)
+        return self.local.service
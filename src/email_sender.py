@@ -1,24 +1,20 @@
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
 from email.header import decode_header
+from typing import List, Optional, Union
 
-import smtplib
 import imaplib
-import email
-import os
 from email.message import EmailMessage
 
+from imap_fetch import InboxState, decode_part, fetch_items, find_html_part, load_state, parse_headers, save_state, sender_search, uid_validity
+from mail_dispatcher import RECEIVER_EMAILS, SENDER_APP_PASSWORD, SENDER_EMAIL, SMTP_PORT, SMTP_SERVER, DeliveryStatus, dispatcher
+from parser_backend import make_soup
+
 load_dotenv()
 
 # --- Configuration ---
-# Your environment variable setup is excellent!
-SENDER_EMAIL = os.getenv("SENDER_EMAIL") or ""
-SENDER_APP_PASSWORD = os.getenv("SENDER_APP_PASSWORD") or ""
-SMTP_SERVER = os.getenv("SMTP_SERVER") or "smtp.gmail.com"
-SMTP_PORT = int(os.getenv("SMTP_PORT") or 587)
-RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL") or ""
+# The account and SMTP settings are read by mail_dispatcher
 SUBJECT = "Daily Tenders"
-IMAP_SERVER = os.getenv("IMAP_SERVER") or "imap.gmail.com"
 
 TARGET_SENDERS = [
         "tenders@tenderdetail.com",
@@ -33,7 +29,7 @@ def find_scrape_link(html_body: str) -> str | None:
     Parses the email's HTML body to find the specific "View All" link.
     This is much more reliable than just finding the first link.
     """
-    soup = BeautifulSoup(html_body, 'html.parser')
+    soup = make_soup(html_body)
     
     # Find an <a> tag where the link text contains "Click Here To View All"
     # This is based on the provided .eml file 
@@ -46,109 +42,123 @@ def find_scrape_link(html_body: str) -> str | None:
     print("❌ Could not find the specific 'Click Here To View All' link in the email.")
     return None
 
-def listen_and_get_link() -> str | None:
+def read_scrape_link(mail: imaplib.IMAP4, uid: int, items: dict) -> str | None:
+    """The scraping link of one fetched email, see find_links_in_inbox."""
+    headers = parse_headers(next((value for name, value in items.items() if name.startswith("BODY[HEADER")), None))
+    print(f"Found new email from {headers.get('From')}: {headers.get('Subject')}")
+
+    # Find the HTML part of the email, including the
+    # nested ones in the forwarded email.
+    part = find_html_part(items.get("BODYSTRUCTURE"))
+    if not part:
+        print("❌ The email has no HTML part.")
+        return None
+    print(f"Fetching the text/html part ({part.size} bytes)...")
+    status, part_data = mail.uid('FETCH', str(uid), f'(BODY.PEEK[{part.section}])')
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH failed: {part_data!r}")
+    content = dict(fetch_items(part_data)).get(uid, {}).get(f"BODY[{part.section}]")
+    if not isinstance(content, bytes):
+        return None
+    # Find the specific link
+    return find_scrape_link(decode_part(content, part))
+
+def find_links_in_inbox(mail: imaplib.IMAP4) -> List[str]:
     """
-    Connects to the inbox, searches for the newest unread email from a target sender,
-    and extracts the scraping link from it.
+    Searches an open inbox for unread emails from the target senders that
+    have not been processed yet, and extracts the scraping link from each,
+    oldest first. IMAP errors are left to the caller.
+
+    One UID SEARCH covers every sender. The headers and BODYSTRUCTURE of all
+    matches come in one FETCH, then only the text/html part of each. The emails
+    are marked as read and the last UID saved to IMAP_STATE_PATH, so none of
+    them ever triggers twice.
     """
-    mail = None
-    try:
-        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
-        mail.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
-        mail.select("inbox")
-        print("✅ Listener connected to inbox.")
-
-        for sender in TARGET_SENDERS:
-            # Search for unread emails from the current sender
-            status, messages = mail.search(None, f'(UNSEEN FROM "{sender}")')
-            
-            if status != "OK" or not messages[0]:
-                continue # Skip to the next sender if no messages found
+    validity = uid_validity(mail)
+    state = load_state()
+    if not state or state.uid_validity != validity:
+        # First run, or the server renumbered the mailbox: UNSEEN alone decides
+        state = InboxState(uid_validity=validity, last_uid=0)
 
-            email_ids = messages[0].split()
-            latest_email_id = email_ids[-1] # Get the most recent one
-            
-            print(f"Found new email from {sender}. Fetching...")
-            
-            # Fetch the full email content
-            status, msg_data = mail.fetch(latest_email_id, "(RFC822)")
-            
-            for response_part in msg_data:
-                if isinstance(response_part, tuple):
-                    msg = email.message_from_bytes(response_part[1])
-                    
-                    # Find the HTML part of the email.
-                    # msg.walk() will traverse all parts, including the
-                    # nested ones in the forwarded email.
-                    html_body = ""
-                    if msg.is_multipart():
-                        for part in msg.walk():
-                            if part.get_content_type() == "text/html":
-                                html_body = part.get_payload(decode=True).decode()
-                                break
-                    else:
-                        if msg.get_content_type() == "text/html":
-                            html_body = msg.get_payload(decode=True).decode()
-                    
-                    if html_body:
-                        # Mark the email as read so we don't process it again
-                        # mail.store(latest_email_id, '+FLAGS', '\\Seen')
-                        # print("Email marked as read.")
-                        
-                        # Find and return the specific link
-                        return find_scrape_link(html_body)
+    # n:* always includes the highest UID, even below n, so the result is filtered again
+    status, messages = mail.uid('SEARCH', None, f'UNSEEN UID {state.last_uid + 1}:* ({sender_search(TARGET_SENDERS)})')
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID SEARCH failed: {messages!r}")
+    uids = sorted(int(uid) for uid in (messages[0] or b"").split() if int(uid) > state.last_uid)
+    if not uids:
+        return []
 
-    except Exception as e:
-        print(f"❌ An error occurred while checking email: {e}")
-    finally:
-        if mail:
-            try:
-                if mail.state == 'SELECTED':
-                    mail.close()
-                    print("Mailbox closed.")
-                mail.logout()
-                print("Listener disconnected (logged out).")
-            except Exception as e:
-                print(f"Error during IMAP cleanup: {e}")
-            
-    return None
+    uid_set = ",".join(str(uid) for uid in uids)
+    status, msg_data = mail.uid('FETCH', uid_set, '(BODYSTRUCTURE BODY.PEEK[HEADER.FIELDS (FROM SUBJECT DATE)])')
+    if status != "OK":
+        raise imaplib.IMAP4.error(f"UID FETCH failed: {msg_data!r}")
+    fetched = dict(fetch_items(msg_data))
+
+    links: List[str] = []
+    for uid in uids:
+        try:
+            link = read_scrape_link(mail, uid, fetched.get(uid, {}))
+        except (imaplib.IMAP4.error, OSError):
+            # The connection is in trouble, the caller reconnects and reads these emails again
+            raise
+        except Exception as e:
+            # One malformed email must not hold back the others
+            print(f"❌ Skipping email {uid}, it could not be read: {e!r}")
+            continue
+        if link:
+            links.append(link)
+
+    # Mark the emails as read so we don't process them again
+    mail.uid('STORE', uid_set, '+FLAGS', '(\\Seen)')
+    state.last_uid = max(state.last_uid, uids[-1])
+    save_state(state)
+    return links
 
-def send_html_email(soup: BeautifulSoup):
+def send_html_email(soup: Union[BeautifulSoup, str, bytes], recipients: Optional[List[str]] = None) -> List[DeliveryStatus]:
     """
-    Constructs an email from a BeautifulSoup object and sends it using Gmail's SMTP server.
+    Constructs an email from a BeautifulSoup object, or HTML already rendered
+    by compiled_template (UTF-8 bytes from write_email), and sends it to every
+    recipient over the shared SMTP session of mail_dispatcher.
+
+    Args:
+        soup: The email body.
+        recipients: Defaults to RECEIVER_EMAILS.
+
+    Returns:
+        The delivery status of every recipient.
     """
+    recipients = recipients or RECEIVER_EMAILS
     if not SENDER_EMAIL or not SENDER_APP_PASSWORD:
         print("❌ Error: SENDER_EMAIL or SENDER_APP_PASSWORD environment variables not set.")
-        return
-    if not RECEIVER_EMAIL:
-        print("❌ Error: RECEIVER_EMAIL environment variable not set.")
-        return 
+        return []
+    if not recipients:
+        print("❌ Error: RECEIVER_EMAILS (or RECEIVER_EMAIL) environment variable not set.")
+        return []
     if not SMTP_SERVER or not SMTP_PORT:
         print("❌ Error: SMTP_SERVER or SMTP_PORT environment variables not set.")
-        return
+        return []
 
-    print(f"Preparing to send email from {SENDER_EMAIL} to {RECEIVER_EMAIL}...")
+    print(f"Preparing to send email from {SENDER_EMAIL} to {len(recipients)} recipients...")
     
     # --- Step 1: Construct the email message using EmailMessage ---
+    # The body is set once, only the To header changes between recipients
     message = EmailMessage()
     message["Subject"] = SUBJECT
     message["From"] = SENDER_EMAIL
-    message["To"] = RECEIVER_EMAIL
 
     # ✅ This is the simpler way to set the HTML content.
     # We use str(soup) instead of soup.prettify() to avoid extra whitespace
     # that can sometimes affect rendering in email clients.
-    message.set_content(str(soup), subtype='html')
+    if isinstance(soup, bytes):
+        # Already serialized and encoded, the bytes go into the message as they are
+        message.set_content(soup, maintype='text', subtype='html', params={'charset': 'utf-8'})
+    else:
+        message.set_content(str(soup), subtype='html')
     
-    # --- Step 2: Connect to the SMTP server and send ---
+    # --- Step 2: Send it over the persistent SMTP session ---
     try:
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
-            server.send_message(message) # .send_message() is the modern method for this object
-        
-        print(f"🎉 Email sent successfully to {RECEIVER_EMAIL}!")
-
+        return dispatcher.send(message, recipients)
     except Exception as e:
+        # A digest that could not be mailed must not fail the run that produced it
         print(f"An unexpected error occurred: {e}")
-
+        return [DeliveryStatus(recipient=recipient, delivered=False, attempts=1, error=str(e)) for recipient in recipients]
@@ -0,0 +1,145 @@
+from datetime import datetime
+from dateutil import parser
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import re
+
+from data_models import TenderDetailPage
+
+# Rupees per unit of the amounts written like "30.40 Crore" or "35 Lakhs"
+AMOUNT_UNITS = {
+    "crore": 10_000_000,
+    "crores": 10_000_000,
+    "cr": 10_000_000,
+    "million": 1_000_000,
+    "millions": 1_000_000,
+    "mn": 1_000_000,
+    "lakh": 100_000,
+    "lakhs": 100_000,
+    "lac": 100_000,
+    "lacs": 100_000,
+    "thousand": 1_000,
+    "k": 1_000,
+}
+# Words that can stand around an amount without changing it. Any other word means
+# the value is not an amount we know how to read, like "Ref.Document".
+AMOUNT_WORDS = {"inr", "rs", "rupee", "rupees", "only"}
+AMOUNT_TOKEN = re.compile(r'\d[\d,]*(?:\.\d+)?|[A-Za-z]+')
+
+MONTHS = {name: number for number, name in enumerate(["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], 1)}
+# The formats the site uses:
+#   01-Nov-2025, 01-Nov-2025 15:00 (tender lists and key dates)
+#   Sunday, Oct 12,2025 (digest header)
+# and 2025-10-12
+DAY_MONTH_YEAR = re.compile(r'(\d{1,2})-([A-Za-z]{3})[A-Za-z]*-(\d{4})(?:\s+(\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+MONTH_DAY_YEAR = re.compile(r'(?:[A-Za-z]+,\s*)?([A-Za-z]{3})[A-Za-z]*\.?\s+(\d{1,2}),\s*(\d{4})')
+
+def clean_text(text: Optional[str]) -> Optional[str]:
+    # The digest pads its cells with newlines and indentation
+    return " ".join(text.split()) if text is not None else None
+
+def parse_rupees(text: Optional[str]) -> Optional[int]:
+    """
+    Amount in whole rupees of a value like "INR 5,900", "30.40 Crore", "Rs. 50 K"
+    or "3 Crores 50 Lakhs", whose parts are added up.
+
+    Returns:
+        None when there is no amount, e.g. "Ref.Document" or "NA", or when the
+        value has a word that is not a unit or one of AMOUNT_WORDS.
+    """
+    if not text:
+        return None
+    # [amount, rupees per unit] of every number, from the largest unit to the smallest
+    parts: List[list] = []
+    for token in AMOUNT_TOKEN.findall(text):
+        if token[0].isdigit():
+            try:
+                parts.append([Decimal(token.replace(",", "")), 1])
+            except InvalidOperation:
+                return None
+            continue
+        word = token.lower()
+        if word in AMOUNT_UNITS and parts and parts[-1][1] == 1:
+            parts[-1][1] = AMOUNT_UNITS[word]
+        elif word not in AMOUNT_WORDS:
+            return None
+    if not parts:
+        return None
+    # "3 Crores 50 Lakhs" is one amount, "5,900 6,000" is not
+    if any(unit <= next_unit for (_, unit), (_, next_unit) in zip(parts, parts[1:])):
+        return None
+    return int(sum(amount * unit for amount, unit in parts))
+
+@lru_cache(maxsize=4096)
+def parse_datetime(text: Optional[str]) -> Optional[datetime]:
+    """
+    Parses a date from the site. The known formats are matched directly,
+    anything else goes through dateutil (day first). Digests repeat the same
+    few dates thousands of times, so results are cached.
+
+    Returns:
+        None when the text is not a date.
+    """
+    if not text:
+        return None
+    text = " ".join(text.split())
+    try:
+        match = DAY_MONTH_YEAR.fullmatch(text)
+        if match:
+            day, month, year, hour, minute, second = match.groups()
+            month_number = MONTHS.get(month.lower())
+            if month_number:
+                return datetime(int(year), month_number, int(day), int(hour or 0), int(minute or 0), int(second or 0))
+        match = MONTH_DAY_YEAR.fullmatch(text)
+        if match:
+            month, day, year = match.groups()
+            month_number = MONTHS.get(month.lower())
+            if month_number:
+                return datetime(int(year), month_number, int(day))
+    except ValueError:
+        # e.g. 31-Feb-2025
+        return None
+    year_first = text[:4].isdigit()
+    if year_first:
+        # 2025-10-12, the format this project writes dates in
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+
+    try:
+        return parser.parse(text, dayfirst=not year_first, yearfirst=year_first)
+    except (parser.ParserError, ValueError, OverflowError):
+        return None
+
+# (string field, typed field) pairs of TenderDetailNotice and TenderDetailKeyDates
+NOTICE_AMOUNTS = [
+    ("document_fees", "document_fees_rupees"),
+    ("emd", "emd_rupees"),
+    ("tender_value", "tender_value_rupees"),
+]
+KEY_DATES = [
+    ("publish_date", "publish_at"),
+    ("last_date_of_bid_submission", "last_date_of_bid_submission_at"),
+    ("tender_opening_date", "tender_opening_at"),
+]
+
+def notice_amounts(fields: Dict[str, str]) -> Dict[str, Optional[int]]:
+    """The typed fields of a TenderDetailNotice, from its string fields."""
+    return {typed: parse_rupees(fields.get(field)) for field, typed in NOTICE_AMOUNTS}
+
+def key_dates(fields: Dict[str, str]) -> Dict[str, Optional[datetime]]:
+    """The typed fields of a TenderDetailKeyDates, from its string fields."""
+    return {typed: parse_datetime(fields.get(field)) for field, typed in KEY_DATES}
+
+def fill_typed_fields(page: TenderDetailPage) -> TenderDetailPage:
+    """Sets the typed fields of a page saved before they existed, e.g. an old page cache entry."""
+    if NOTICE_AMOUNTS[0][1] not in page.notice.model_fields_set:
+        for name, value in notice_amounts(page.notice.model_dump()).items():
+            setattr(page.notice, name, value)
+    if KEY_DATES[0][1] not in page.key_dates.model_fields_set:
+        for name, value in key_dates(page.key_dates.model_dump()).items():
+            setattr(page.key_dates, name, value)
+    return page
@@ -0,0 +1,37 @@
+from typing import List, Tuple
+
+import glob
+import os
+
+from page_cache import PAGE_CACHE_DIR
+
+# Saved pages used by the parity check in test.py and by benchmark.py:
+#   output.html: a saved digest home page
+#   fixtures/*.html: detail pages written by hand after the site's markup, one per
+#     layout the parser has to handle (label aliases, missing rows, no attachments)
+#   the page cache: raw detail pages, when PAGE_CACHE_STORE_HTML is on
+FIXTURE_PATTERNS = [
+    "output.html",
+    os.path.join("fixtures", "*.html"),
+    os.path.join(PAGE_CACHE_DIR, "*.html"),
+]
+
+def page_kind(content: bytes) -> str | None:
+    """Tells a tender detail page from a digest home page by their container classes."""
+    if b'tender-details-home' in content:
+        return "detail"
+    if b'm-main-count' in content:
+        return "home"
+    return None
+
+def load_fixture_pages() -> List[Tuple[str, str, bytes]]:
+    """Returns (path, kind, content) for every saved page, kind being "home" or "detail"."""
+    pages: List[Tuple[str, str, bytes]] = []
+    for pattern in FIXTURE_PATTERNS:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'rb') as f:
+                content = f.read()
+            kind = page_kind(content)
+            if kind:
+                pages.append((path, kind, content))
+    return pages
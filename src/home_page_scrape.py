@@ -1,13 +1,27 @@
-from typing import List, Tuple
 from bs4 import BeautifulSoup
-
-import requests
+from typing import List, Optional, Tuple
 
 from data_models import HomePageData, HomePageHeader, Tender, TenderQuery
+from field_parsers import parse_datetime, parse_rupees
+from parser_backend import PARSE_SUBTREE, class_strainer, make_soup
+import http_client
 
 def scrape_page(url) -> HomePageData:
-    page = requests.get(url)
-    soup = BeautifulSoup(page.content, 'html.parser')
+    page = http_client.get(url)
+    return parse_home_page(page.content)
+
+# The date, the tender count and every query table are inside the container-fluid div
+HOME_PAGE_STRAINER = class_strainer('div', 'container-fluid')
+
+def parse_home_page(content: bytes, backend: Optional[str] = None, subtree: bool = PARSE_SUBTREE) -> HomePageData:
+    if subtree:
+        try:
+            return scrape_home_soup(make_soup(content, backend, HOME_PAGE_STRAINER))
+        except Exception as e:
+            print(f"⚠️  Subtree parse failed ({e}), parsing the whole page.")
+    return scrape_home_soup(make_soup(content, backend))
+
+def scrape_home_soup(soup: BeautifulSoup) -> HomePageData:
 
     # There are two p-mr-date classes in the page. The first one contains the date, second one contains contact info
     date_elem = soup.find('p', attrs={'class': 'm-r-date'})
@@ -63,7 +77,6 @@ def scrape_page(url) -> HomePageData:
         query_name = td_elements[0].text
         no_of_tenders = td_elements[1].text
         queries_and_numbers.append((query_name, no_of_tenders))
-        print(row)
 
     # The last one is the list of queries, and their 
     # children tables are tender datas.
@@ -114,7 +127,7 @@ def scrape_page(url) -> HomePageData:
             tender_id_elem = summary_elem.find('strong')
             if not tender_id_elem:
                 raise Exception("Tender ID not found")
-            tender_id = tender_id_elem.text.split(':')[1]
+            tender_id = tender_id_elem.text.split(':')[1].strip()
 
             tender_value = m_td_brief_elements[1].text.split(':')[1]
             due_date = m_td_brief_elements[2].text.split(':')[1]
@@ -133,7 +146,9 @@ def scrape_page(url) -> HomePageData:
                 summary=summary_elem.text,
                 value=tender_value,
                 due_date=due_date,
-                details=None
+                details=None,
+                value_rupees=parse_rupees(tender_value),
+                due_at=parse_datetime(due_date)
             ))
 
         tenders_list_list.append(tender_query_list)
@@ -0,0 +1,167 @@
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+import os
+import requests
+import threading
+
+load_dotenv()
+
+# --- Configuration ---
+# Keep-alive connections kept per host. Should be at least the number of scraping workers.
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE") or 32)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT") or 10)
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT") or 30)
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES") or 4)
+# Sleep before retry n is HTTP_BACKOFF_FACTOR * 2^(n - 1) plus up to HTTP_BACKOFF_JITTER seconds of noise
+HTTP_BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR") or 0.5)
+HTTP_BACKOFF_JITTER = float(os.getenv("HTTP_BACKOFF_JITTER") or 0.5)
+# Upper bound on simultaneous requests to any single host, so we don't hammer tenderdetail.com
+SCRAPE_PER_HOST = int(os.getenv("SCRAPE_PER_HOST") or 8)
+
+DEFAULT_TIMEOUT = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+
+class HostLimiter:
+    """
+    Hands out one semaphore per host so that no more than `limit`
+    requests are in flight against the same host at any moment.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self.lock = threading.Lock()
+
+    def get(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.semaphores:
+                self.semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self.semaphores[host]
+
+# --- Counters ---
+stats_lock = threading.Lock()
+stats: Dict[str, int] = {
+    "requests": 0,
+    "connection_checkouts": 0,
+    "connections_opened": 0,
+    "retries": 0,
+    "bytes_received": 0,
+}
+
+def increment(counter: str, amount: int = 1):
+    with stats_lock:
+        stats[counter] += amount
+
+def get_stats(since: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Returns a snapshot of the client counters, counted from an earlier
+    snapshot when `since` is given. The counters are shared by every digest
+    scraped at the same time.
+    """
+    with stats_lock:
+        snapshot = {counter: value - (since or {}).get(counter, 0) for counter, value in stats.items()}
+    # Every checkout that did not need a new connection reused a keep-alive one
+    snapshot["connections_reused"] = snapshot["connection_checkouts"] - snapshot["connections_opened"]
+    return snapshot
+
+def print_stats(since: Optional[Dict[str, int]] = None):
+    snapshot = get_stats(since)
+    print(
+        f"🌐 HTTP: {snapshot['requests']} requests, "
+        f"{snapshot['connections_opened']} connections opened, "
+        f"{snapshot['connections_reused']} reused, "
+        f"{snapshot['retries']} retries, "
+        f"{snapshot['bytes_received'] / 1024 / 1024:.2f} MB received"
+    )
+
+# urllib3 calls _get_conn once per attempt and _new_conn only when the pool has
+# no idle keep-alive connection left, which is what the counters are built on.
+class CountingHTTPConnectionPool(HTTPConnectionPool):
+    def _get_conn(self, timeout=None):
+        increment("connection_checkouts")
+        return super()._get_conn(timeout)
+
+    def _new_conn(self):
+        increment("connections_opened")
+        return super()._new_conn()
+
+class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    def _get_conn(self, timeout=None):
+        increment("connection_checkouts")
+        return super()._get_conn(timeout)
+
+    def _new_conn(self):
+        increment("connections_opened")
+        return super()._new_conn()
+
+class CountingRetry(Retry):
+    def increment(self, *args, **kwargs):
+        new_retry = super().increment(*args, **kwargs)
+        # Only reached when another attempt is allowed, otherwise super() raises
+        increment("retries")
+        return new_retry
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools count opened and reused connections."""
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+def build_session() -> requests.Session:
+    """
+    Builds a requests session that keeps connections alive per host and retries
+    transient failures (connection errors and 429/5xx) with jittered exponential backoff.
+    """
+    retry = CountingRetry(
+        total=HTTP_MAX_RETRIES,
+        backoff_factor=HTTP_BACKOFF_FACTOR,
+        backoff_jitter=HTTP_BACKOFF_JITTER,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+# The one session shared by every scraper and downloader. The underlying urllib3
+# pools are thread safe, so it can be used from the scraping workers directly.
+session = build_session()
+
+def get(url: str, stream: bool = False, timeout=DEFAULT_TIMEOUT, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    Performs a GET through the shared session.
+
+    Raises requests.HTTPError if the server still answers with an error status
+    after all retries. When stream is False the body is read immediately and
+    counted, otherwise read it with iter_content so the bytes are counted.
+    """
+    increment("requests")
+    response = session.get(url, stream=stream, timeout=timeout, headers=headers)
+    response.raise_for_status()
+    if not stream:
+        increment("bytes_received", len(response.content))
+    return response
+
+def iter_content(response: requests.Response, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """Iterates over a streamed response body, counting the bytes received."""
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        if chunk:
+            increment("bytes_received", len(chunk))
+            yield chunk
@@ -0,0 +1,186 @@
+from dotenv import load_dotenv
+from email.parser import BytesHeaderParser
+from pydantic import BaseModel
+from typing import List, Optional, Tuple, Union
+
+import base64
+import imaplib
+import os
+import quopri
+import re
+
+load_dotenv()
+
+# --- Configuration ---
+# Where the listener remembers the last email it processed
+IMAP_STATE_PATH = os.getenv("IMAP_STATE_PATH") or "imap_state.json"
+
+# A parsed IMAP response: atoms and strings are bytes, NIL is None, lists are lists
+ImapValue = Union[bytes, None, List["ImapValue"]]
+
+class InboxState(BaseModel):
+    # UIDs are only comparable while the mailbox keeps the same UIDVALIDITY
+    uid_validity: int
+    last_uid: int
+
+class HtmlPart(BaseModel):
+    # Section number for BODY[...], e.g. "2" or "1.2"
+    section: str
+    encoding: str
+    charset: str
+    size: int
+
+def load_state(path: str = IMAP_STATE_PATH) -> Optional[InboxState]:
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return InboxState.model_validate_json(f.read())
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable IMAP state {path}: {e}")
+        return None
+
+def save_state(state: InboxState, path: str = IMAP_STATE_PATH):
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        f.write(state.model_dump_json(indent=2))
+    os.replace(temp_path, path)
+
+def sender_search(senders: List[str]) -> str:
+    """One search key matching mail from any of the senders: OR OR FROM "a" FROM "b" FROM "c"."""
+    return "OR " * (len(senders) - 1) + " ".join(f'FROM "{sender}"' for sender in senders)
+
+def uid_validity(mail: imaplib.IMAP4) -> int:
+    """The UIDVALIDITY sent with SELECT, or asked for with STATUS once that has been read."""
+    _, data = mail.response('UIDVALIDITY')
+    if data and data[-1]:
+        return int(data[-1])
+    _, data = mail.status('INBOX', '(UIDVALIDITY)')
+    match = re.search(rb'UIDVALIDITY (\d+)', data[0] or b"")
+    if not match:
+        raise imaplib.IMAP4.error(f"No UIDVALIDITY in {data!r}")
+    return int(match.group(1))
+
+def join_response(data: list) -> bytes:
+    """Puts a FETCH response back together: imaplib splits every {n} literal out into a tuple."""
+    joined = b""
+    for item in data:
+        if isinstance(item, tuple):
+            joined += item[0] + b"\r\n" + item[1]
+        elif item:
+            joined += item
+    return joined
+
+TOKEN = re.compile(rb'\s*(?:(\()|(\))|"((?:[^"\\]|\\.)*)"|\{(\d+)\}\r\n|([^\s()"{]+))', re.DOTALL)
+
+def parse_imap_list(data: bytes) -> List[ImapValue]:
+    """Parses a response like b'1 (UID 7 BODYSTRUCTURE ("TEXT" "HTML" NIL ...))' into nested lists."""
+    stack: List[List[ImapValue]] = [[]]
+    position = 0
+    while position < len(data):
+        match = TOKEN.match(data, position)
+        if not match:
+            if data[position:].strip():
+                raise imaplib.IMAP4.error(f"Unexpected IMAP data at {position}: {data[position:position + 40]!r}")
+            break
+        position = match.end()
+        opening, closing, quoted, literal, atom = match.groups()
+        if opening:
+            stack.append([])
+        elif closing:
+            if len(stack) == 1:
+                raise imaplib.IMAP4.error("Unbalanced parenthesis in IMAP data")
+            finished = stack.pop()
+            stack[-1].append(finished)
+        elif quoted is not None:
+            stack[-1].append(re.sub(rb'\\(.)', rb'\1', quoted))
+        elif literal is not None:
+            size = int(literal)
+            stack[-1].append(data[position:position + size])
+            position += size
+        else:
+            stack[-1].append(None if atom.upper() == b"NIL" else atom)
+    return stack[0]
+
+def fetch_items(data: list) -> List[Tuple[int, dict]]:
+    """
+    Parses a UID FETCH response into (uid, {item name: value}), one per message.
+    Item names are upper case, e.g. "BODYSTRUCTURE" or "BODY[HEADER.FIELDS (FROM SUBJECT)]".
+    """
+    messages: List[Tuple[int, dict]] = []
+    values = parse_imap_list(join_response(data))
+    # <sequence number> (<name> <value> ...) for every message
+    for sequence, attributes in zip(values[0::2], values[1::2]):
+        if not isinstance(attributes, list):
+            continue
+        items = {}
+        index = 0
+        while index + 1 < len(attributes):
+            name = attributes[index]
+            value = attributes[index + 1]
+            index += 2
+            if isinstance(name, bytes) and isinstance(value, list) and name.upper().startswith(b"BODY[HEADER.FIELDS"):
+                # BODY[HEADER.FIELDS (FROM SUBJECT)] is split at the field list by the tokenizer
+                name = name + b" (" + b" ".join(field for field in value if isinstance(field, bytes)) + b")]"
+                value = attributes[index + 1] if index + 1 < len(attributes) else None
+                index += 2
+            if isinstance(name, bytes):
+                items[name.decode().upper()] = value
+        uid = items.get("UID")
+        if isinstance(uid, bytes):
+            messages.append((int(uid), items))
+    return messages
+
+def find_html_part(structure: ImapValue, section: str = "") -> Optional[HtmlPart]:
+    """
+    Walks a BODYSTRUCTURE depth first, like Message.walk(), and returns the
+    first text/html part. Forwarded emails (message/rfc822 parts) are walked into.
+    """
+    if not isinstance(structure, list) or not structure:
+        return None
+
+    if isinstance(structure[0], list):
+        # multipart: the parts, then the subtype and extension data
+        for index, part in enumerate(structure):
+            if not isinstance(part, list):
+                break
+            found = find_html_part(part, f"{section}.{index + 1}" if section else str(index + 1))
+            if found:
+                return found
+        return None
+
+    # A single part body is numbered 1 at the top level
+    section = section or "1"
+    media_type = (structure[0] or b"").upper()
+    subtype = (structure[1] or b"").upper() if len(structure) > 1 and isinstance(structure[1], bytes) else b""
+    if media_type == b"TEXT" and subtype == b"HTML":
+        params = structure[2] if isinstance(structure[2], list) else []
+        charset = "utf-8"
+        for name, value in zip(params[0::2], params[1::2]):
+            if isinstance(name, bytes) and name.upper() == b"CHARSET" and isinstance(value, bytes):
+                charset = value.decode()
+        encoding = structure[5] if len(structure) > 5 and isinstance(structure[5], bytes) else b"7BIT"
+        size = structure[6] if len(structure) > 6 and isinstance(structure[6], bytes) else b"0"
+        return HtmlPart(section=section, encoding=encoding.decode().lower(), charset=charset, size=int(size))
+
+    if media_type == b"MESSAGE" and subtype == b"RFC822" and len(structure) > 8:
+        # The body of the attached message: a multipart numbers its parts under this one,
+        # a single part is this section's .1
+        inner = structure[8]
+        if isinstance(inner, list) and inner and isinstance(inner[0], list):
+            return find_html_part(inner, section)
+        return find_html_part(inner, section + ".1")
+    return None
+
+def decode_part(content: bytes, part: HtmlPart) -> str:
+    if part.encoding == "base64":
+        content = base64.b64decode(content)
+    elif part.encoding == "quoted-printable":
+        content = quopri.decodestring(content)
+    try:
+        return content.decode(part.charset, errors="replace")
+    except LookupError:
+        return content.decode("utf-8", errors="replace")
+
+def parse_headers(headers: Optional[bytes]) -> dict:
+    return dict(BytesHeaderParser().parsebytes(headers or b"").items())
@@ -0,0 +1,185 @@
+from dotenv import load_dotenv
+from typing import Optional
+
+import imaplib
+import os
+import select
+import time
+
+from mail_dispatcher import IMAP_SERVER, SENDER_APP_PASSWORD, SENDER_EMAIL
+
+load_dotenv()
+
+# --- Configuration ---
+# The account and IMAP server are read by mail_dispatcher
+# Servers end an IDLE after 30 minutes, so it is restarted a bit before that
+IMAP_IDLE_TIMEOUT = int(os.getenv("IMAP_IDLE_TIMEOUT") or 25 * 60)
+# Only used when the server does not support IDLE
+IMAP_POLL_INTERVAL = int(os.getenv("IMAP_POLL_INTERVAL") or 300)
+# Reconnects wait this long, doubling up to IMAP_RECONNECT_MAX_DELAY while the server stays unreachable
+IMAP_RECONNECT_DELAY = float(os.getenv("IMAP_RECONNECT_DELAY") or 5)
+IMAP_RECONNECT_MAX_DELAY = float(os.getenv("IMAP_RECONNECT_MAX_DELAY") or 300)
+# How long the server gets to answer DONE. A connection that silently died never will.
+IMAP_RESPONSE_TIMEOUT = float(os.getenv("IMAP_RESPONSE_TIMEOUT") or 60)
+
+# Untagged responses that mean the mailbox changed
+NEW_MAIL_RESPONSES = [b"EXISTS", b"RECENT"]
+
+class ImapIdleListener:
+    """
+    Keeps one logged in IMAP connection on the inbox and waits on it with
+    IDLE (RFC 2177), so new mail is noticed within seconds instead of on the
+    next poll. imaplib has no IDLE, the command is sent by hand.
+
+    Typical use:
+        while True:
+            check the inbox with listener.get()
+            listener.wait_for_mail()
+    """
+    def __init__(self):
+        self.mail: Optional[imaplib.IMAP4_SSL] = None
+        self.failures = 0
+
+    def connect(self) -> imaplib.IMAP4_SSL:
+        mail = imaplib.IMAP4_SSL(IMAP_SERVER)
+        try:
+            mail.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
+            # Servers can advertise more after login, IDLE included
+            _, capabilities = mail.capability()
+            mail.capabilities = tuple(capabilities[-1].decode().upper().split())
+            mail.select("inbox")
+        except Exception:
+            mail.shutdown()
+            raise
+        print("✅ Listener connected to inbox.")
+        return mail
+
+    def get(self) -> imaplib.IMAP4_SSL:
+        """Returns the connection, logging in again if it was dropped."""
+        if not self.mail:
+            self.mail = self.connect()
+            self.failures = 0
+        return self.mail
+
+    def drop(self):
+        """Forgets a connection that failed, waiting a little longer after every failure in a row."""
+        if self.mail:
+            try:
+                self.mail.shutdown()
+            except Exception:
+                pass
+        self.mail = None
+        delay = min(IMAP_RECONNECT_MAX_DELAY, IMAP_RECONNECT_DELAY * 2 ** self.failures)
+        self.failures += 1
+        print(f"⚠️  IMAP connection lost, reconnecting in {delay:.0f}s...")
+        time.sleep(delay)
+
+    def close(self):
+        if self.mail:
+            try:
+                if self.mail.state == 'SELECTED':
+                    self.mail.close()
+                self.mail.logout()
+                print("Listener disconnected (logged out).")
+            except Exception as e:
+                print(f"Error during IMAP cleanup: {e}")
+        self.mail = None
+
+    def read_available(self, mail: imaplib.IMAP4_SSL, readable: bool) -> bytes:
+        """
+        Reads what the server has already sent, without blocking: first what
+        imaplib buffered, then what is waiting on the socket.
+
+        Args:
+            readable: select() reported the socket readable, so getting nothing means it was closed.
+        """
+        data = b""
+        mail.sock.setblocking(False)
+        try:
+            while True:
+                try:
+                    chunk = mail.file.read1(65536)
+                except OSError:
+                    # TLS sockets raise when there is nothing to read
+                    break
+                if not chunk:
+                    if readable and not data:
+                        raise imaplib.IMAP4.abort("connection closed by the server")
+                    break
+                data += chunk
+        finally:
+            mail.sock.setblocking(True)
+        return data
+
+    def idle(self, timeout: float) -> bool:
+        """
+        Runs one IDLE command for at most `timeout` seconds.
+
+        Returns:
+            True as soon as the server reports new mail, False on timeout.
+        """
+        mail = self.get()
+        tag = mail._new_tag()
+        mail.send(tag + b" IDLE\r\n")
+        response = mail.readline()
+        if not response.startswith(b"+"):
+            raise imaplib.IMAP4.error(f"IDLE refused: {response!r}")
+
+        new_mail = False
+        # Bytes of a line that has not been fully received yet
+        pending = b""
+        readable = False
+        deadline = time.monotonic() + timeout
+        while True:
+            # The continuation and the first update can arrive together, so read what is buffered before waiting
+            *lines, pending = (pending + self.read_available(mail, readable)).split(b"\r\n")
+            for line in lines:
+                if line.startswith(b"* BYE"):
+                    raise imaplib.IMAP4.abort(line.decode(errors="replace").strip())
+                if line.startswith(b"* ") and any(word in line for word in NEW_MAIL_RESPONSES):
+                    new_mail = True
+            remaining = deadline - time.monotonic()
+            if new_mail or remaining <= 0:
+                break
+            readable = bool(select.select([mail.sock], [], [], remaining)[0])
+            if not readable:
+                break
+
+        mail.send(b"DONE\r\n")
+        mail.sock.settimeout(IMAP_RESPONSE_TIMEOUT)
+        try:
+            while True:
+                line = pending + mail.readline()
+                pending = b""
+                if not line:
+                    raise imaplib.IMAP4.abort("connection closed by the server")
+                if line.startswith(tag):
+                    if b" OK" not in line:
+                        raise imaplib.IMAP4.error(f"IDLE failed: {line!r}")
+                    break
+                if line.startswith(b"* ") and any(word in line for word in NEW_MAIL_RESPONSES):
+                    new_mail = True
+        finally:
+            mail.sock.settimeout(None)
+        return new_mail
+
+    def wait_for_mail(self):
+        """
+        Blocks until the server reports new mail. Also returns after a
+        reconnect, since mail may have arrived while the connection was down.
+        """
+        while True:
+            try:
+                mail = self.get()
+                if "IDLE" not in mail.capabilities:
+                    print(f"Server does not support IDLE, checking again in {IMAP_POLL_INTERVAL / 60} minutes...")
+                    time.sleep(IMAP_POLL_INTERVAL)
+                    return
+                if self.idle(IMAP_IDLE_TIMEOUT):
+                    print("📬 New mail arrived.")
+                    return
+                # Quiet mailbox, start a new IDLE before the server times this one out
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                print(f"❌ IMAP error while waiting for mail: {e}")
+                self.drop()
+                return
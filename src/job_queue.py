@@ -0,0 +1,343 @@
+from dotenv import load_dotenv
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pydantic import BaseModel
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+
+load_dotenv()
+
+# --- Configuration ---
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH") or "jobs.db"
+# Threads running jobs, each scrapes one digest at a time
+JOB_WORKERS = int(os.getenv("JOB_WORKERS") or 1)
+# A job that failed this many times stays failed until it is submitted again
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS") or 3)
+# Idle workers also look for jobs submitted by other processes this often
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL") or 5)
+# A running job whose process has not renewed its lease for this long is queued again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS") or 300)
+# The HTTP submit endpoint is off unless a port is set
+JOB_HTTP_HOST = os.getenv("JOB_HTTP_HOST") or "127.0.0.1"
+JOB_HTTP_PORT = int(os.getenv("JOB_HTTP_PORT") or 0)
+
+# queued -> running -> done, or back to queued until JOB_MAX_ATTEMPTS, then failed
+JOB_STATUSES = ["queued", "running", "done", "failed"]
+
+# Running jobs are owned by the process that claimed them
+HOSTNAME = socket.gethostname()
+
+def process_owner() -> str:
+    return f"{HOSTNAME}:{os.getpid()}"
+
+def owner_alive(owner: str) -> bool:
+    """Whether the process that claimed a job still runs. Only known for this host, other hosts rely on the lease."""
+    host, _, pid = owner.rpartition(":")
+    if host != HOSTNAME or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+# Added after the first release, created on databases that predate them
+LEASE_COLUMNS = [("owner", "TEXT"), ("heartbeat_at", "REAL")]
+
+class Job(BaseModel):
+    id: int
+    url: str
+    source: str
+    status: str
+    attempts: int
+    error: Optional[str]
+    created_at: float
+    updated_at: float
+    # host:pid of the process running the job, and when it last said it still was
+    owner: Optional[str] = None
+    heartbeat_at: Optional[float] = None
+
+class JobQueue:
+    """
+    Durable queue of digest links to scrape, in a SQLite database.
+
+    A digest URL is only ever queued once: submitting it again is a no-op
+    unless its job failed. Every status change is committed before the work
+    it describes. A running job belongs to the process that claimed it, which
+    renews a lease on it while it runs; the job is put back in the queue once
+    that process is gone or its lease has run out, never while it is alive.
+    """
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.wakeup = threading.Condition(self.lock)
+        # One connection shared by the threads of this process, guarded by the lock
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(jobs)")}
+        for name, sql_type in LEASE_COLUMNS:
+            if name not in columns:
+                self.connection.execute(f"ALTER TABLE jobs ADD COLUMN {name} {sql_type}")
+        self.connection.create_function("owner_alive", 1, owner_alive)
+        self.owner = process_owner()
+
+    def resume(self) -> int:
+        """
+        Puts back the running jobs whose process is gone: it exited (on this host),
+        or stopped renewing its lease. Returns how many.
+        """
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = 'queued', owner = NULL, heartbeat_at = NULL, updated_at = ? "
+                "WHERE status = 'running' AND (owner IS NULL OR heartbeat_at IS NULL OR heartbeat_at < ? OR NOT owner_alive(owner))",
+                (now, now - JOB_LEASE_SECONDS)
+            )
+            if cursor.rowcount:
+                self.wakeup.notify_all()
+            return cursor.rowcount
+
+    def heartbeat(self):
+        """Renews the lease on every job this process is running."""
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = 'running' AND owner = ?",
+                (time.time(), self.owner)
+            )
+
+    def submit(self, url: str, source: str) -> Tuple[Job, bool]:
+        """
+        Queues a digest link.
+
+        Returns:
+            The job for the URL, and whether this call queued it (False for a duplicate).
+        """
+        url = url.strip()
+        now = time.time()
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO jobs (url, source, status, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?)",
+                (url, source, now, now)
+            )
+            queued = cursor.rowcount == 1
+            if not queued:
+                # A failed digest can be retried by submitting it again
+                cursor = self.connection.execute(
+                    "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated_at = ? WHERE url = ? AND status = 'failed'",
+                    (now, url)
+                )
+                queued = cursor.rowcount == 1
+            job = self.get_locked("url = ?", (url,))
+            if queued:
+                self.wakeup.notify()
+        return job, queued
+
+    def claim(self) -> Optional[Job]:
+        """Marks the oldest queued job as running in this process and returns it."""
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, owner = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) "
+                "RETURNING id",
+                (self.owner, now, now)
+            ).fetchone()
+            return self.get_locked("id = ?", (row[0],)) if row else None
+
+    def finish(self, job: Job, error: Optional[Exception] = None):
+        """Records the outcome of a claimed job. Failures are queued again until JOB_MAX_ATTEMPTS."""
+        if error is None:
+            status = "done"
+        else:
+            status = "queued" if job.attempts < JOB_MAX_ATTEMPTS else "failed"
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ? AND status = 'running' AND owner = ?",
+                (status, str(error) if error else None, time.time(), job.id, self.owner)
+            )
+            if not cursor.rowcount:
+                print(f"⚠️  Job {job.id} was put back in the queue while it ran, not recording its outcome.")
+            elif status == "queued":
+                self.wakeup.notify()
+
+    def wait(self, timeout: float):
+        """Sleeps until a job is submitted in this process, or for `timeout` seconds."""
+        with self.lock:
+            self.wakeup.wait(timeout)
+
+    def get_locked(self, where: str, params: tuple) -> Optional[Job]:
+        self.connection.row_factory = sqlite3.Row
+        try:
+            row = self.connection.execute(f"SELECT * FROM jobs WHERE {where}", params).fetchone()
+        finally:
+            self.connection.row_factory = None
+        return Job(**dict(row)) if row else None
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self.lock:
+            return self.get_locked("id = ?", (job_id,))
+
+    def list(self, status: Optional[str] = None, limit: int = 100) -> List[Job]:
+        """The most recent jobs, newest first."""
+        with self.lock:
+            self.connection.row_factory = sqlite3.Row
+            try:
+                if status:
+                    rows = self.connection.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id DESC LIMIT ?", (status, limit)).fetchall()
+                else:
+                    rows = self.connection.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+            finally:
+                self.connection.row_factory = None
+        return [Job(**dict(row)) for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+class JobWorkers:
+    """A pool of threads that run `handler(url)` for every job of the queue."""
+    def __init__(self, queue: JobQueue, handler: Callable[[str], None], workers: int = JOB_WORKERS):
+        self.queue = queue
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.stopping = threading.Event()
+        self.threads: List[threading.Thread] = []
+
+    def run_heartbeat(self):
+        # Often enough that a slow write or two never lets a lease run out
+        while not self.stopping.wait(JOB_LEASE_SECONDS / 4):
+            self.queue.heartbeat()
+            # Jobs of processes that died since this one started
+            resumed = self.queue.resume()
+            if resumed:
+                print(f"🗂️  Resuming {resumed} jobs whose process is gone.")
+
+    def run_worker(self):
+        while not self.stopping.is_set():
+            job = self.queue.claim()
+            if not job:
+                self.queue.wait(JOB_POLL_INTERVAL)
+                continue
+            print(f"🚀 Job {job.id} (attempt {job.attempts}/{JOB_MAX_ATTEMPTS}): {job.url}")
+            try:
+                self.handler(job.url)
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {e}")
+                self.queue.finish(job, e)
+            else:
+                print(f"✅ Job {job.id} done.")
+                self.queue.finish(job)
+
+    def start(self):
+        resumed = self.queue.resume()
+        if resumed:
+            print(f"🗂️  Resuming {resumed} jobs that were interrupted.")
+        for worker in range(self.workers):
+            thread = threading.Thread(target=self.run_worker, name=f"job-{worker}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        heartbeat = threading.Thread(target=self.run_heartbeat, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self.threads.append(heartbeat)
+
+    def stop(self):
+        """Lets the running jobs finish and stops the workers."""
+        self.stopping.set()
+        with self.queue.lock:
+            self.queue.wakeup.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+def start_http_server(queue: JobQueue, host: str = JOB_HTTP_HOST, port: int = JOB_HTTP_PORT) -> ThreadingHTTPServer:
+    """
+    Serves the queue over HTTP in a background thread:
+        POST /jobs      url=<digest link> (form or JSON body), queues it
+        GET  /jobs      the most recent jobs, ?status= to filter
+        GET  /jobs/<id> one job
+    """
+    class JobRequestHandler(BaseHTTPRequestHandler):
+        def reply(self, status: int, body):
+            content = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            parts = path.strip("/").split("/")
+            if parts == ["jobs"]:
+                status = parse_qs(query).get("status", [None])[0]
+                self.reply(200, [job.model_dump() for job in queue.list(status)])
+            elif len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+                job = queue.get(int(parts[1]))
+                self.reply(200, job.model_dump()) if job else self.reply(404, {"error": "No such job"})
+            else:
+                self.reply(404, {"error": "Not found"})
+
+        def do_POST(self):
+            if self.path.strip("/") != "jobs":
+                self.reply(404, {"error": "Not found"})
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+            if "json" in (self.headers.get("Content-Type") or ""):
+                url = (json.loads(body or "{}") or {}).get("url")
+            else:
+                url = parse_qs(body).get("url", [None])[0]
+            if not url:
+                self.reply(400, {"error": "url is required"})
+                return
+            job, queued = queue.submit(url, "http")
+            self.reply(201 if queued else 200, {"queued": queued, "job": job.model_dump()})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), JobRequestHandler)
+    threading.Thread(target=server.serve_forever, name="job-http", daemon=True).start()
+    print(f"🌐 Accepting jobs on http://{host}:{server.server_address[1]}/jobs")
+    return server
+
+def main():
+    # python job_queue.py submit <link> | list [status]
+    args = sys.argv[1:]
+    queue = JobQueue()
+    if len(args) == 2 and args[0] == "submit":
+        job, queued = queue.submit(args[1], "cli")
+        print(f"{'Queued' if queued else 'Already queued'}: job {job.id} ({job.status})")
+    elif args and args[0] == "list":
+        for job in queue.list(args[1] if len(args) > 1 else None):
+            print(f"{job.id:>5}  {job.status:<8} {job.attempts} attempts  {job.url}" + (f"  ({job.error})" if job.error else ""))
+    else:
+        print("Usage: python job_queue.py submit <link> | list [" + "|".join(JOB_STATUSES) + "]")
+    queue.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+from dotenv import load_dotenv
+from email.message import EmailMessage
+from pydantic import BaseModel
+from typing import List, Optional
+
+import os
+import smtplib
+import threading
+import time
+
+load_dotenv()
+
+# --- Configuration ---
+SENDER_EMAIL = os.getenv("SENDER_EMAIL") or ""
+SENDER_APP_PASSWORD = os.getenv("SENDER_APP_PASSWORD") or ""
+SMTP_SERVER = os.getenv("SMTP_SERVER") or "smtp.gmail.com"
+SMTP_PORT = int(os.getenv("SMTP_PORT") or 587)
+# The same account reads the trigger emails, see imap_listener
+IMAP_SERVER = os.getenv("IMAP_SERVER") or "imap.gmail.com"
+# Comma separated. RECEIVER_EMAIL still works for a single recipient.
+RECEIVER_EMAILS = [address.strip() for address in (os.getenv("RECEIVER_EMAILS") or os.getenv("RECEIVER_EMAIL") or "").split(",") if address.strip()]
+# Messages sent per minute over the session, Gmail throttles accounts that send in bursts
+MAIL_MAX_PER_MINUTE = int(os.getenv("MAIL_MAX_PER_MINUTE") or 60)
+MAIL_SEND_RETRIES = int(os.getenv("MAIL_SEND_RETRIES") or 3)
+MAIL_RETRY_DELAY = float(os.getenv("MAIL_RETRY_DELAY") or 2)
+# A session is logged out and opened again after this many messages
+MAIL_SESSION_MAX_MESSAGES = int(os.getenv("MAIL_SESSION_MAX_MESSAGES") or 100)
+
+class DeliveryStatus(BaseModel):
+    recipient: str
+    delivered: bool
+    attempts: int
+    error: Optional[str] = None
+
+class TemporaryFailure(Exception):
+    pass
+
+class SendInterval:
+    """
+    Spaces messages at least 60 / max_per_minute seconds apart, so a burst of
+    recipients goes out at the configured pace from the very first message.
+    """
+    def __init__(self, max_per_minute: int):
+        self.interval = 60 / max_per_minute if max_per_minute > 0 else 0.0
+        self.next_send = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            send_at = max(now, self.next_send)
+            self.next_send = send_at + self.interval
+        if send_at > now:
+            time.sleep(send_at - now)
+
+class SmtpSession:
+    """
+    One authenticated SMTP connection, reused for every message until the
+    server drops it or MAIL_SESSION_MAX_MESSAGES have gone through it.
+    The handshake (connect, STARTTLS, login) is only paid when it reconnects.
+    """
+    def __init__(self):
+        self.server: Optional[smtplib.SMTP] = None
+        self.sent = 0
+
+    def connect(self) -> smtplib.SMTP:
+        print(f"Connecting to {SMTP_SERVER}:{SMTP_PORT} as {SENDER_EMAIL}...")
+        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
+        try:
+            server.starttls()
+            server.login(SENDER_EMAIL, SENDER_APP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        self.sent = 0
+        return server
+
+    def get(self) -> smtplib.SMTP:
+        """Returns a live session, checking an idle one with NOOP before reusing it."""
+        if self.server and self.sent >= MAIL_SESSION_MAX_MESSAGES:
+            self.close()
+        if self.server:
+            try:
+                if self.server.noop()[0] == 250:
+                    return self.server
+            except smtplib.SMTPException:
+                pass
+            self.drop()
+        self.server = self.connect()
+        return self.server
+
+    def send(self, message: EmailMessage, recipient: str):
+        self.get().send_message(message, to_addrs=[recipient])
+        self.sent += 1
+
+    def drop(self):
+        """Forgets a connection that is already broken."""
+        if self.server:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+        self.server = None
+
+    def close(self):
+        if self.server:
+            try:
+                self.server.quit()
+            except smtplib.SMTPException:
+                pass
+        self.drop()
+
+class MailDispatcher:
+    """
+    Sends messages over one persistent SmtpSession, at most MAIL_MAX_PER_MINUTE
+    of them a minute. Each recipient gets their own copy, is retried on its own
+    and gets its own DeliveryStatus, so one bad address does not fail the rest.
+    """
+    def __init__(self, max_per_minute: int = MAIL_MAX_PER_MINUTE):
+        self.session = SmtpSession()
+        self.interval = SendInterval(max_per_minute)
+        self.lock = threading.Lock()
+
+    def send_one(self, message: EmailMessage, recipient: str) -> DeliveryStatus:
+        attempt = 0
+        while True:
+            attempt += 1
+            self.interval.wait()
+            try:
+                del message["To"]
+                message["To"] = recipient
+                self.session.send(message, recipient)
+                return DeliveryStatus(recipient=recipient, delivered=True, attempts=attempt)
+            except smtplib.SMTPRecipientsRefused as e:
+                # The server will not take this address, retrying will not help
+                return DeliveryStatus(recipient=recipient, delivered=False, attempts=attempt, error=str(e.recipients.get(recipient, e)))
+            except smtplib.SMTPResponseException as e:
+                # 4xx is temporary, 5xx is final
+                if not 400 <= e.smtp_code < 500 or attempt > MAIL_SEND_RETRIES:
+                    return DeliveryStatus(recipient=recipient, delivered=False, attempts=attempt, error=f"{e.smtp_code} {e.smtp_error!r}")
+                if e.smtp_code == 421:
+                    # Service closing the channel
+                    self.session.drop()
+                error = e
+            except OSError as e:
+                # SMTPException is an OSError too. Only a broken connection is worth retrying,
+                # anything else smtplib raises (e.g. no supported login method) will fail again.
+                self.session.drop()
+                retryable = isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(e, smtplib.SMTPException)
+                if not retryable or attempt > MAIL_SEND_RETRIES:
+                    return DeliveryStatus(recipient=recipient, delivered=False, attempts=attempt, error=str(e))
+                error = e
+            delay = MAIL_RETRY_DELAY * 2 ** (attempt - 1)
+            print(f"⚠️  Sending to {recipient} failed ({error}), retrying in {delay:.0f}s ({attempt}/{MAIL_SEND_RETRIES})")
+            time.sleep(delay)
+
+    def send(self, message: EmailMessage, recipients: List[str]) -> List[DeliveryStatus]:
+        """
+        Sends `message` to every recipient, one after the other over the same session.
+        Call it once per segment to send different digests to different groups of recipients.
+        """
+        with self.lock:
+            statuses = [self.send_one(message, recipient) for recipient in recipients]
+        report(statuses)
+        return statuses
+
+    def close(self):
+        with self.lock:
+            self.session.close()
+
+def report(statuses: List[DeliveryStatus]):
+    delivered = [status for status in statuses if status.delivered]
+    for status in statuses:
+        if not status.delivered:
+            print(f"❌ Could not send to {status.recipient} after {status.attempts} attempts: {status.error}")
+    print(f"🎉 Email delivered to {len(delivered)}/{len(statuses)} recipients.")
+
+# Shared by every digest of the process, so the session outlives a single send
+dispatcher = MailDispatcher()
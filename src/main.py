@@ -1,3 +1,4 @@
+import asyncio
 import time
 from dotenv import load_dotenv
 from bs4 import BeautifulSoup
@@ -7,21 +8,31 @@ from selenium.webdriver.chrome.webdriver import WebDriver
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.by import By
 
+import imaplib
 import requests
 import re
 import json
 import os
 
 # Local modules
-from detail_page_scrape import scrape_tender
-from drive import authenticate_google_drive, download_folders, get_shareable_link, upload_folder_to_drive
-from email_sender import listen_and_get_link, send_html_email
+from async_scrape import scrape_digest_async
+from compiled_template import write_email
+from data_models import HomePageData
+from email_sender import find_links_in_inbox, send_html_email
 from home_page_scrape import scrape_page
-from templater import generate_email, reformat_page
+from imap_listener import ImapIdleListener
+from job_queue import JOB_HTTP_PORT, JobQueue, JobWorkers, start_http_server
+from parquet_export import PARQUET_EXPORT_ENABLED, export_digest
+from pipeline import run_pipeline
+from tender_db import TenderDatabase
+import http_client
+import page_cache
 
 load_dotenv()
 
 GOOGLE_DRIVE_PARENT_FOLDER = os.getenv("GOOGLE_DRIVE_PARENT_FOLDER")
+# "threads" scrapes detail pages in the pipeline's thread pool, "async" on an asyncio event loop
+SCRAPE_BACKEND = os.getenv("SCRAPE_BACKEND") or "threads"
 base_url = "https://www.tenderdetail.com"
 tdr_xpath = "/html/body/div/div[1]/section[2]/div[1]/div/div/table[1]/tbody/tr[2]/td[2]"
 
@@ -41,53 +52,122 @@ def insert_drive_links(soup: BeautifulSoup):
     for tender1, tender2 in zip(soup1_tenders_links, soup2_tenders_links):
         tender1['href'] = tender2.find_all('a')[0]['href']
 
-def scrape_link(link: str):
-    homepage = scrape_page(link)
-    removed_tenders = {}
-    for query_table in homepage.query_table:
-        print("Current query: " + query_table.query_name)
-        for tender in query_table.tenders:
-            try:
-                tender.details = scrape_tender(tender.tender_url)
-            except Exception as e:
-                query_table.tenders.remove(tender)
-                removed_tenders[tender.tender_id] = json.loads(tender.model_dump_json(indent=2))
-                print("Error: " + str(e))
-
-    download_folders(homepage)
-    generated_template = generate_email(homepage)
-    # insert_drive_links(generated_template)
+# Several job workers can scrape digests at the same time. What they share is safe
+# for that: tenders are locked one at a time in the pipeline, the Drive index and
+# the tender store are shared objects, and email.html and removed_tenders.json are
+# replaced atomically, holding the digest that finished last.
 
-    with open("email.html", "w") as f:
-        f.write(generated_template.prettify())
+def scrape_link(link: str):
+    if SCRAPE_BACKEND == "async":
+        asyncio.run(scrape_link_async(link))
+        return
 
-    with open("removed_tenders.json", "w") as f:
-        f.write(json.dumps(removed_tenders))
+    stats = (http_client.get_stats(), page_cache.get_stats())
+    homepage = scrape_page(link)
+    publish_digest(homepage, {}, link, stats)
 
-    send_html_email(generated_template)
+async def scrape_link_async(link: str):
+    """
+    asyncio entry point of scrape_link. The home page and every detail page are
+    scraped on the event loop, the blocking rest of the digest runs in a worker thread.
+    """
+    stats = (http_client.get_stats(), page_cache.get_stats())
+    homepage, removed_tenders = await scrape_digest_async(link)
+    await asyncio.to_thread(publish_digest, homepage, removed_tenders, link, stats)
+
+def publish_digest(homepage: HomePageData, removed_tenders: dict, link: str | None = None, stats: tuple = ({}, {})):
+    # Scrape, download, upload and render every tender as a stream.
+    # Tenders that already have their details skip the scrape stage.
+    pipeline_removed_tenders, rendered_rows = run_pipeline(homepage)
+    removed_tenders.update(pipeline_removed_tenders)
+    # Rendered once, streamed to email.html and sent as the very same bytes
+    email_body = write_email(homepage, rendered_rows, "email.html")
+
+    page_cache.write_atomic("removed_tenders.json", json.dumps(removed_tenders).encode())
+    # Kept for searching past digests, see tender_db.py. The digest is sent even if this fails.
+    try:
+        database = TenderDatabase()
+        try:
+            database.save_digest(homepage, removed_tenders, link)
+        finally:
+            database.close()
+    except Exception as e:
+        print(f"❌ Could not save the digest to the tender database: {e}")
+    # Columnar copy for analytics, see parquet_export.py. Not worth holding the digest back for.
+    if PARQUET_EXPORT_ENABLED:
+        try:
+            export_digest(homepage, link)
+        except Exception as e:
+            print(f"❌ Could not export the digest to Parquet: {e}")
+
+    # Counted since the digest started, requests of digests running alongside included
+    http_stats, cache_stats = stats
+    http_client.print_stats(http_stats)
+    page_cache.print_stats(cache_stats)
+    send_html_email(email_body)
 
 def listen_email():
-    while True:
-        print("\n--- Starting new cycle: Listening for trigger email ---")
-        
-        # 1. Call the listener to get a link
-        link_to_scrape = listen_and_get_link()
-
-        # 2. If a link is found, run the scraper
-        if link_to_scrape:
-            print(f"🚀 Link found! Starting scrape for: {link_to_scrape}")
+    # Trigger emails only queue their links. The workers scrape them in the
+    # background, so mail keeps being read while a digest is being scraped and
+    # a digest that was interrupted is scraped again on the next start.
+    queue = JobQueue()
+    workers = JobWorkers(queue, scrape_link)
+    workers.start()
+    server = start_http_server(queue) if JOB_HTTP_PORT else None
+    # One IMAP connection stays open, new mail wakes the loop up through IDLE
+    listener = ImapIdleListener()
+    try:
+        while True:
+            print("\n--- Starting new cycle: Checking the inbox for trigger emails ---")
+
+            # 1. Look for links on the open connection
             try:
-                scrape_link(link_to_scrape) # Your existing scraping function
-                print("✅ Scraping and email sending process completed successfully.")
+                links = find_links_in_inbox(listener.get())
+            except (imaplib.IMAP4.abort, imaplib.IMAP4.error, OSError) as e:
+                print(f"❌ An error occurred while checking email: {e}")
+                listener.drop()
+                continue
             except Exception as e:
-                print(f"❌ An error occurred during the scrape/send process: {e}")
-        else:
-            print("No new trigger email found.")
-
-        # 3. Wait for 5 minutes before checking again
-        sleep_duration_seconds = 300
-        print(f"--- Cycle complete. Waiting for {sleep_duration_seconds / 60} minutes... ---")
-        time.sleep(sleep_duration_seconds)
+                # Not the connection: keep it and listen on, the next new mail is checked as usual
+                print(f"❌ An unexpected error occurred while checking email: {e!r}")
+                links = []
+
+            # 2. Queue every link that was not queued before
+            for link in links:
+                job, queued = queue.submit(link, "email")
+                if queued:
+                    print(f"🗂️  Queued job {job.id}: {link}")
+                else:
+                    print(f"Already queued as job {job.id} ({job.status}): {link}")
+            if not links:
+                print("No new trigger email found.")
+
+            # 3. Wait until the server reports new mail
+            print("--- Cycle complete. Waiting for new mail... ---")
+            listener.wait_for_mail()
+    finally:
+        listener.close()
+        if server:
+            server.shutdown()
+        workers.stop()
+        queue.close()
+
+def run_workers():
+    """Scrapes the queued digests without reading the inbox. Links come from the CLI or HTTP."""
+    queue = JobQueue()
+    workers = JobWorkers(queue, scrape_link)
+    workers.start()
+    server = start_http_server(queue) if JOB_HTTP_PORT else None
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if server:
+            server.shutdown()
+        workers.stop()
+        queue.close()
     
 if __name__ == "__main__":
     """
@@ -97,8 +177,9 @@ if __name__ == "__main__":
     print("Select a start mode: ")
     print("1. Paste a link")
     print("2. Listen for emails")
+    print("3. Run the job queue workers")
 
-    choice = input("Enter your choice (1/2): ")
+    choice = input("Enter your choice (1/2/3): ")
 
     if choice == '1':
         link_to_scrape = input("Enter the link to scrape: ")
@@ -110,5 +191,8 @@ if __name__ == "__main__":
     elif choice == '2':
         listen_email()
 
+    elif choice == '3':
+        run_workers()
+
     else:
-        print("Invalid choice. Please select 1 or 2.")
+        print("Invalid choice. Please select 1, 2 or 3.")
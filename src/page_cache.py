@@ -0,0 +1,193 @@
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import Dict, Optional
+
+import hashlib
+import os
+import threading
+import time
+
+from data_models import TenderDetailPage
+from field_parsers import fill_typed_fields
+
+load_dotenv()
+
+# --- Configuration ---
+PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR") or "cache/pages"
+# Entries younger than this are served without touching the network.
+# Older ones are revalidated with a conditional GET.
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL") or 24 * 60 * 60)
+# Least recently used entries are evicted once the cache grows past this size
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES") or 200 * 1024 * 1024)
+# Also keep the raw HTML of every page next to the parsed entry
+PAGE_CACHE_STORE_HTML = (os.getenv("PAGE_CACHE_STORE_HTML") or "false").lower() == "true"
+PAGE_CACHE_ENABLED = (os.getenv("PAGE_CACHE_ENABLED") or "true").lower() == "true"
+
+class CachedPage(BaseModel):
+    url: str
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+    page: TenderDetailPage
+
+lock = threading.Lock()
+# Total size of the cache directory, computed on first use
+cache_size: Optional[int] = None
+stats: Dict[str, int] = {
+    "hits": 0,
+    "revalidated": 0,
+    "misses": 0,
+}
+
+def cache_key(url: str) -> str:
+    return hashlib.sha256(url.strip().encode()).hexdigest()
+
+def entry_path(url: str) -> str:
+    return os.path.join(PAGE_CACHE_DIR, cache_key(url) + ".json")
+
+def html_path(url: str) -> str:
+    return os.path.join(PAGE_CACHE_DIR, cache_key(url) + ".html")
+
+def increment(counter: str):
+    with lock:
+        stats[counter] += 1
+
+def get_stats(since: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """The cache counters, counted from an earlier snapshot when `since` is given."""
+    with lock:
+        snapshot: Dict[str, float] = {counter: value - (since or {}).get(counter, 0) for counter, value in stats.items()}
+    lookups = snapshot["hits"] + snapshot["revalidated"] + snapshot["misses"]
+    # A revalidated entry skipped the download and the parse, so it counts as a hit
+    snapshot["hit_ratio"] = (snapshot["hits"] + snapshot["revalidated"]) / lookups if lookups else 0.0
+    return snapshot
+
+def print_stats(since: Optional[Dict[str, float]] = None):
+    snapshot = get_stats(since)
+    print(
+        f"🗄️  Page cache: {snapshot['hits']} hits, {snapshot['revalidated']} revalidated, "
+        f"{snapshot['misses']} misses ({snapshot['hit_ratio']:.0%} hit ratio)"
+    )
+
+def load(url: str) -> Optional[CachedPage]:
+    """Returns the cached entry for a URL, or None if there is none (or it is unreadable)."""
+    if not PAGE_CACHE_ENABLED:
+        return None
+    path = entry_path(url)
+    try:
+        with open(path, 'r') as f:
+            entry = CachedPage.model_validate_json(f.read())
+        fill_typed_fields(entry.page)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Ignoring corrupt cache entry {path}: {e}")
+        return None
+    # Bump the modification time so eviction sees this entry as recently used
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return entry
+
+def is_fresh(entry: CachedPage) -> bool:
+    return time.time() - entry.stored_at < PAGE_CACHE_TTL
+
+def conditional_headers(entry: Optional[CachedPage]) -> Optional[Dict[str, str]]:
+    """Headers that turn a request for a stale entry into a conditional GET."""
+    if not entry:
+        return None
+    headers = {}
+    if entry.etag:
+        headers["If-None-Match"] = entry.etag
+    if entry.last_modified:
+        headers["If-Modified-Since"] = entry.last_modified
+    return headers or None
+
+def write_atomic(path: str, content: bytes) -> int:
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+    os.replace(temp_path, path)
+    return len(content)
+
+def store(url: str, page: TenderDetailPage, headers, raw_html: Optional[bytes] = None) -> CachedPage:
+    """Stores a freshly parsed page along with the validators the server sent for it."""
+    entry = CachedPage(
+        url=url,
+        etag=headers.get("ETag"),
+        last_modified=headers.get("Last-Modified"),
+        stored_at=time.time(),
+        page=page
+    )
+    if not PAGE_CACHE_ENABLED:
+        return entry
+
+    os.makedirs(PAGE_CACHE_DIR, exist_ok=True)
+    path = entry_path(url)
+    previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+    written = write_atomic(path, entry.model_dump_json().encode())
+    if PAGE_CACHE_STORE_HTML and raw_html is not None:
+        if os.path.exists(html_path(url)):
+            previous_size += os.path.getsize(html_path(url))
+        written += write_atomic(html_path(url), raw_html)
+
+    grow(written - previous_size)
+    return entry
+
+def refresh(url: str, entry: CachedPage) -> CachedPage:
+    """Marks an entry as fresh again after the server answered 304 Not Modified."""
+    entry.stored_at = time.time()
+    if PAGE_CACHE_ENABLED:
+        write_atomic(entry_path(url), entry.model_dump_json().encode())
+    return entry
+
+def load_html(url: str) -> Optional[bytes]:
+    """Returns the raw HTML stored for a URL, if PAGE_CACHE_STORE_HTML was on when it was cached."""
+    try:
+        with open(html_path(url), 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+def grow(amount: int):
+    global cache_size
+    with lock:
+        if cache_size is None:
+            cache_size = sum(entry.stat().st_size for entry in os.scandir(PAGE_CACHE_DIR) if entry.is_file())
+        else:
+            cache_size += amount
+        over_limit = cache_size > PAGE_CACHE_MAX_BYTES
+    if over_limit:
+        evict()
+
+def evict():
+    """Removes least recently used entries until the cache fits in PAGE_CACHE_MAX_BYTES."""
+    global cache_size
+    with lock:
+        # Group the parsed entry and its raw HTML, they are evicted together
+        groups: Dict[str, Dict[str, float]] = {}
+        for file in os.scandir(PAGE_CACHE_DIR):
+            if not file.is_file() or file.name.endswith(".tmp"):
+                continue
+            stat = file.stat()
+            key = file.name.split(".")[0]
+            group = groups.setdefault(key, {"size": 0, "used": 0})
+            group["size"] += stat.st_size
+            if file.name.endswith(".json"):
+                group["used"] = stat.st_mtime
+
+        total = sum(group["size"] for group in groups.values())
+        evicted = 0
+        for key, group in sorted(groups.items(), key=lambda item: item[1]["used"]):
+            if total <= PAGE_CACHE_MAX_BYTES:
+                break
+            for extension in (".json", ".html"):
+                try:
+                    os.remove(os.path.join(PAGE_CACHE_DIR, key + extension))
+                except FileNotFoundError:
+                    pass
+            total -= group["size"]
+            evicted += 1
+
+        cache_size = total
+    print(f"🗄️  Page cache: evicted {evicted} entries")
@@ -0,0 +1,231 @@
+from datetime import date, datetime
+from dotenv import load_dotenv
+from typing import Dict, List, Optional
+
+import hashlib
+import os
+import sys
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+import pyarrow.parquet as pq
+
+from data_models import HomePageData, TenderDetailContactInformation, TenderDetailKeyDates, TenderDetailNotice
+from drive import parse_date
+from field_parsers import clean_text
+import tender_db
+
+load_dotenv()
+
+# --- Configuration ---
+# Holds tenders/ and files/, each partitioned by digest date (digest_date=YYYY-MM-DD/)
+EXPORT_DIR = os.getenv("EXPORT_DIR") or "exports"
+PARQUET_EXPORT_ENABLED = (os.getenv("PARQUET_EXPORT_ENABLED") or "true").lower() == "true"
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION") or "zstd"
+
+# Notice fields whose name is already a column of the tenders table. The table is
+# flat, so the notice's city clashes with the digest's too.
+RENAMED_NOTICE_FIELDS = {**tender_db.RENAMED_NOTICE_FIELDS, "city": "notice_city"}
+
+def arrow_type(model, field: str) -> pa.DataType:
+    annotation = model.model_fields[field].annotation
+    if annotation == Optional[int]:
+        return pa.int64()
+    if annotation == Optional[datetime]:
+        return pa.timestamp("s")
+    return pa.string()
+
+# (model, section of TenderDetailPage, field, column) for the detail columns of the tenders table
+DETAIL_FIELDS = [
+    (model, section, field, RENAMED_NOTICE_FIELDS.get(field, field) if section == "notice" else field)
+    for model, section in [
+        (TenderDetailNotice, "notice"),
+        (TenderDetailKeyDates, "key_dates"),
+        (TenderDetailContactInformation, "contact_information"),
+    ]
+    for field in model.model_fields
+]
+
+# One row per tender of a digest, a tender listed under several queries has one row per query
+TENDERS_SCHEMA = pa.schema(
+    [
+        ("digest_link", pa.string()),
+        ("digest_name", pa.string()),
+        ("query_name", pa.string()),
+        ("position", pa.int32()),
+        ("tender_id", pa.string()),
+        ("tender_name", pa.string()),
+        ("tender_url", pa.string()),
+        ("drive_url", pa.string()),
+        ("city", pa.string()),
+        ("summary", pa.string()),
+        ("value", pa.string()),
+        ("value_rupees", pa.int64()),
+        ("due_date", pa.string()),
+        ("due_at", pa.timestamp("s")),
+        ("has_details", pa.bool_()),
+    ]
+    + [(column, arrow_type(model, field)) for model, _, field, column in DETAIL_FIELDS]
+    + [
+        ("tender_details", pa.string()),
+        ("information_source", pa.string()),
+        ("file_count", pa.int32()),
+    ]
+)
+
+# One row per attachment of a tender of a digest
+FILES_SCHEMA = pa.schema([
+    ("tender_id", pa.string()),
+    ("position", pa.int32()),
+    ("file_name", pa.string()),
+    ("file_url", pa.string()),
+    ("file_description", pa.string()),
+    ("file_size", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("digest_date", pa.date32())]), flavor="hive")
+
+def digest_file_name(data: HomePageData, link: Optional[str]) -> str:
+    """Same digest, same file: exporting a digest again replaces its rows instead of adding them twice."""
+    key = (link or "") + "\x00" + " ".join(data.header.date.split()) + "\x00" + data.header.name
+    return "digest-" + hashlib.sha256(key.encode()).hexdigest()[:16] + ".parquet"
+
+def digest_tables(data: HomePageData, link: Optional[str] = None) -> Dict[str, pa.Table]:
+    """Flattens a digest into the rows of the tenders and files tables."""
+    tenders: Dict[str, List[object]] = {name: [] for name in TENDERS_SCHEMA.names}
+    files: Dict[str, List[object]] = {name: [] for name in FILES_SCHEMA.names}
+    exported_files = set()
+    for query in data.query_table:
+        for position, tender in enumerate(query.tenders):
+            tender_id = clean_text(tender.tender_id)
+            row = {
+                "digest_link": link,
+                "digest_name": clean_text(data.header.name),
+                "query_name": clean_text(query.query_name),
+                "position": position,
+                "tender_id": tender_id,
+                "tender_name": clean_text(tender.tender_name),
+                "tender_url": tender.tender_url,
+                "drive_url": tender.drive_url,
+                "city": clean_text(tender.city),
+                "summary": clean_text(tender.summary),
+                "value": clean_text(tender.value),
+                "value_rupees": tender.value_rupees,
+                "due_date": clean_text(tender.due_date),
+                "due_at": tender.due_at,
+                "has_details": tender.details is not None,
+            }
+            details = tender.details
+            for _, section, field, column in DETAIL_FIELDS:
+                value = getattr(getattr(details, section), field) if details else None
+                row[column] = clean_text(value) if isinstance(value, str) else value
+            row["tender_details"] = details.details.tender_details if details else None
+            row["information_source"] = details.other_detail.information_source if details else None
+            row["file_count"] = len(details.other_detail.files) if details else 0
+            for name, value in row.items():
+                tenders[name].append(value)
+
+            # Attachments belong to the tender, not to the query it is listed under
+            if not details or tender_id in exported_files:
+                continue
+            exported_files.add(tender_id)
+            for file_position, file in enumerate(details.other_detail.files):
+                files["tender_id"].append(tender_id)
+                files["position"].append(file_position)
+                files["file_name"].append(file.file_name)
+                files["file_url"].append(file.file_url)
+                files["file_description"].append(file.file_description)
+                files["file_size"].append(file.file_size)
+    return {
+        "tenders": pa.Table.from_pydict(tenders, schema=TENDERS_SCHEMA),
+        "files": pa.Table.from_pydict(files, schema=FILES_SCHEMA),
+    }
+
+def write_table_atomic(table: pa.Table, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Hidden until complete, so a scan never opens a half written file
+    temp_path = os.path.join(os.path.dirname(path), "." + os.path.basename(path) + ".tmp")
+    pq.write_table(table, temp_path, compression=PARQUET_COMPRESSION)
+    os.replace(temp_path, path)
+
+def export_digest(data: HomePageData, link: Optional[str] = None, export_dir: str = EXPORT_DIR) -> Optional[str]:
+    """
+    Appends a digest to the Parquet dataset: one file per table under its
+    digest_date partition. Earlier digests are never rewritten.
+
+    Returns:
+        The digest date, or None if the digest has no date to be partitioned by.
+    """
+    digest_date = parse_date(data.header.date.strip())
+    if digest_date == "unknown-date":
+        print("⚠️  Not exporting a digest without a date.")
+        return None
+    file_name = digest_file_name(data, link)
+    tables = digest_tables(data, link)
+    for table_name, table in tables.items():
+        write_table_atomic(table, os.path.join(export_dir, table_name, f"digest_date={digest_date}", file_name))
+    print(f"🗄️  Exported {tables['tenders'].num_rows} tenders and {tables['files'].num_rows} files of {digest_date} to {export_dir}.")
+    return digest_date
+
+def open_dataset(table_name: str = "tenders", export_dir: str = EXPORT_DIR) -> ds.Dataset:
+    """
+    The exported table as an Arrow dataset. The files are memory mapped and only
+    the partitions and columns a scan needs are read.
+    """
+    # Pre-buffering batches reads for remote storage, mapped files are read in place
+    file_format = ds.ParquetFileFormat(default_fragment_scan_options=ds.ParquetFragmentScanOptions(pre_buffer=False))
+    return ds.dataset(
+        os.path.join(export_dir, table_name),
+        format=file_format,
+        partitioning=PARTITIONING,
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+        exclude_invalid_files=False,
+        ignore_prefixes=[".", "_"],
+    )
+
+def scan_tenders(
+    state: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_value: Optional[int] = None,
+    max_value: Optional[int] = None,
+    columns: Optional[List[str]] = None,
+    export_dir: str = EXPORT_DIR
+) -> pa.Table:
+    """
+    Exported tenders matching every filter that is set.
+
+    Args:
+        date_from, date_to: Inclusive bounds on the digest date, only those partitions are opened.
+        min_value, max_value: Inclusive bounds in rupees on value_rupees.
+        columns: The columns to read, all of them when None.
+    """
+    conditions = []
+    if state:
+        conditions.append(ds.field("state") == state)
+    if date_from:
+        conditions.append(ds.field("digest_date") >= date_from)
+    if date_to:
+        conditions.append(ds.field("digest_date") <= date_to)
+    if min_value is not None:
+        conditions.append(ds.field("value_rupees") >= min_value)
+    if max_value is not None:
+        conditions.append(ds.field("value_rupees") <= max_value)
+    condition = None
+    for expression in conditions:
+        condition = expression if condition is None else condition & expression
+    return open_dataset("tenders", export_dir).to_table(columns=columns, filter=condition)
+
+def main():
+    # python parquet_export.py [state] : totals per digest date of the exported tenders
+    state = sys.argv[1] if len(sys.argv) > 1 else None
+    table = scan_tenders(state=state, columns=["digest_date", "tender_id", "value_rupees"])
+    totals = table.group_by("digest_date").aggregate([("tender_id", "count"), ("value_rupees", "sum")]).sort_by("digest_date")
+    for row in totals.to_pylist():
+        print(f"{row['digest_date']}  {row['tender_id_count']:>5} tenders  ₹{row['value_rupees_sum'] or 0:>16,}")
+    print(f"{table.num_rows} tenders" + (f" in {state}" if state else "") + f", ₹{pc.sum(table['value_rupees']).as_py() or 0:,} in total.")
+
+if __name__ == '__main__':
+    main()
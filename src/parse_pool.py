@@ -0,0 +1,55 @@
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+
+import multiprocessing
+import os
+
+from data_models import TenderDetailPage
+from detail_page_scrape import parse_tender_page_json
+
+load_dotenv()
+
+# --- Configuration ---
+# BeautifulSoup holds the GIL while it builds a tree, so scrape threads only fetch in
+# parallel. With this on, detail pages are parsed in PARSE_WORKERS separate processes.
+PARSE_IN_PROCESSES = (os.getenv("PARSE_IN_PROCESSES") or "false").lower() == "true"
+# One process per core by default
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS") or os.cpu_count() or 1)
+
+def process_context():
+    """
+    Worker processes come from a fork server, a clean process started for the
+    purpose, never from a fork of this one. By the time pages are parsed the job,
+    scrape, upload and mail threads are running, and a child forked while one of
+    them holds a lock can deadlock on it.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        # Windows only spawns, which is just as safe
+        return None
+    context = multiprocessing.get_context("forkserver")
+    # Imported once in the server instead of in every worker
+    context.set_forkserver_preload(["detail_page_scrape"])
+    return context
+
+class ParsePool:
+    """
+    Parses raw detail pages in worker processes.
+
+    The HTML bytes go to a worker running parse_tender_page and the page comes
+    back as JSON, which is cheaper to send between processes than the soup.
+    parse() blocks, so it can be handed to scrape_tender from any scrape thread.
+    """
+    def __init__(self, max_workers: int = PARSE_WORKERS):
+        self.max_workers = max_workers
+        self.executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=process_context())
+
+    def start(self):
+        """Starts the fork server and a first worker now rather than on the first page."""
+        self.executor.submit(int).result()
+
+    def parse(self, content: bytes) -> TenderDetailPage:
+        serialized = self.executor.submit(parse_tender_page_json, content).result()
+        return TenderDetailPage.model_validate_json(serialized)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
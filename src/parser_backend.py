@@ -0,0 +1,71 @@
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.dammit import EncodingDetector
+from dotenv import load_dotenv
+from typing import Optional, Pattern
+
+import os
+import re
+
+load_dotenv()
+
+# Tree builders every scraper can run on. They all produce the same
+# BeautifulSoup API, so the scraping code does not change between them.
+#   html.parser: pure Python, always available, slowest
+#   lxml: libxml2 based, several times faster
+PARSER_BACKENDS = ["html.parser", "lxml"]
+
+# Check `python test.py` (parser parity) on saved pages before switching the default
+PARSER_BACKEND = os.getenv("PARSER_BACKEND") or "html.parser"
+if PARSER_BACKEND not in PARSER_BACKENDS:
+    raise Exception(f"Unknown PARSER_BACKEND '{PARSER_BACKEND}', expected one of {PARSER_BACKENDS}")
+
+# Build only the part of a page the scrapers read (e.g. the tender-details-home div)
+# instead of the whole document. Pages where that part is missing are parsed in full.
+PARSE_SUBTREE = (os.getenv("PARSE_SUBTREE") or "true").lower() == "true"
+
+def class_strainer(tag: str, class_name: str) -> SoupStrainer:
+    """
+    Strainer for the elements of one class. Classes are not split into a list
+    yet while the strainer runs, so "container-fluid mt-15" has to be matched
+    as a string that contains the class.
+    """
+    return SoupStrainer(tag, attrs={'class': re.compile(r'(^|\s)' + re.escape(class_name) + r'(\s|$)')})
+
+def skip_to(content, start: Pattern):
+    """
+    Drops everything in front of the first match of `start`, so the header,
+    navigation and inline scripts before the content are never tokenized.
+
+    The encoding declared in the dropped <head> is returned with the rest of the page,
+    bytes without a declared encoding are left whole so the detected encoding cannot change.
+
+    Returns:
+        The remaining content and its encoding (None for str or when nothing was dropped).
+    """
+    if isinstance(content, bytes):
+        encoding = EncodingDetector.find_declared_encoding(content, is_html=True)
+        if not encoding:
+            return content, None
+    else:
+        encoding = None
+    match = start.search(content)
+    if not match:
+        return content, None
+    return content[match.start():], encoding
+
+def make_soup(content, backend: Optional[str] = None, parse_only: Optional[SoupStrainer] = None, start: Optional[Pattern] = None) -> BeautifulSoup:
+    """
+    Parses HTML with the configured backend.
+
+    Args:
+        content: The HTML, as bytes or str.
+        backend: Overrides PARSER_BACKEND, used by the parity check and the benchmark.
+        parse_only: Only elements matching this strainer (and everything inside them) are built.
+        start: Pattern of the first tag worth tokenizing, see skip_to.
+    """
+    options = {}
+    if start is not None:
+        content, encoding = skip_to(content, start)
+        if encoding:
+            options["from_encoding"] = encoding
+    return BeautifulSoup(content, backend or PARSER_BACKEND, parse_only=parse_only, **options)
@@ -0,0 +1,417 @@
+from dotenv import load_dotenv
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import os
+import queue
+import threading
+import time
+
+from compiled_template import compile_template, render_tender_row_html
+from data_models import HomePageData, Tender, TenderDetailPageFile, TenderQuery
+from detail_page_scrape import scrape_tender
+from downloader import DOWNLOAD_BANDWIDTH, DOWNLOAD_WORKERS, BandwidthLimiter, download_one
+from drive import DRIVE_BATCH_SIZE, authenticate_google_drive, load_credentials, parse_date, resolve_date_folder, share_folders
+from drive_index import DriveIndex, DriveTenderFolder
+from drive_upload import DRIVE_UPLOAD_WORKERS, ThreadServices, find_file, upload_file
+from http_client import SCRAPE_PER_HOST, HostLimiter
+from parse_pool import PARSE_IN_PROCESSES, ParsePool
+from tender_store import TenderStore
+
+load_dotenv()
+
+# --- Configuration ---
+# Maximum number of tenders waiting in front of each stage. A full queue
+# blocks the stage before it, so a slow stage throttles the ones upstream.
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE") or 32)
+PIPELINE_LINK_WORKERS = int(os.getenv("PIPELINE_LINK_WORKERS") or 1)
+PIPELINE_RENDER_WORKERS = int(os.getenv("PIPELINE_RENDER_WORKERS") or 1)
+# Total number of detail pages fetched at the same time
+SCRAPE_WORKERS = int(os.getenv("SCRAPE_WORKERS") or 16)
+
+class TenderLocks:
+    """
+    One lock per tender id, for the digests of a process that run at the same
+    time. A tender is locked from the start of its download until its upload is
+    in the tender store, so two digests never download or upload it side by side
+    and the second one sees what the first one uploaded.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks: Dict[str, threading.Lock] = {}
+
+    def get(self, tender_id: str) -> threading.Lock:
+        with self.lock:
+            return self.locks.setdefault(tender_id, threading.Lock())
+
+tender_locks = TenderLocks()
+# The Drive index and the tender store are loaded once and shared by every digest
+# of the process, each of them saves its changes through the same objects
+shared_lock = threading.Lock()
+shared_index: Optional[DriveIndex] = None
+shared_store: Optional[TenderStore] = None
+# Resolving and listing a date folder is done by one digest at a time, so two
+# digests of the same date do not both create it
+date_folder_lock = threading.Lock()
+
+def shared_state() -> Tuple[DriveIndex, TenderStore]:
+    global shared_index, shared_store
+    with shared_lock:
+        if shared_index is None:
+            shared_index = DriveIndex()
+        if shared_store is None:
+            shared_store = TenderStore()
+        return shared_index, shared_store
+
+class TenderJob:
+    """One tender travelling through the pipeline."""
+    def __init__(self, position: int, query_table: TenderQuery, tender: Tender):
+        self.position = position
+        self.query_table = query_table
+        self.tender = tender
+        self.folder_path: Optional[str] = None
+        self.folder: Optional[DriveTenderFolder] = None
+        # Set when the folder on Drive already holds the attachments
+        self.uploaded = False
+        # Attachments to download and upload, only the new ones for a tender seen in an earlier digest
+        self.attachments: List[TenderDetailPageFile] = []
+        # Names of attachments that changed since they went into the folder, their Drive file is replaced
+        self.replaced: Set[str] = set()
+        # Attachments that went into the folder during this run
+        self.uploaded_files: List[TenderDetailPageFile] = []
+        # The tender's lock while this job downloads and uploads it, see TenderLocks
+        self.claim: Optional[threading.Lock] = None
+        self.row: Optional[str] = None
+        # Set when a stage dropped the tender. scrape failures go to removed_tenders.
+        self.error: Optional[Exception] = None
+        self.failed_stage: Optional[str] = None
+
+    def release(self):
+        if self.claim:
+            self.claim.release()
+            self.claim = None
+
+# Marks the end of the input of a stage
+DONE = object()
+
+class Stage:
+    """
+    A pool of worker threads between two bounded queues.
+
+    handler(jobs) receives one job, or up to batch_size jobs that were already
+    waiting when batch_size > 1. A job whose handler raises is dropped from the
+    pipeline with the error recorded on it, the others move on to the next stage.
+    """
+    def __init__(self, name: str, handler: Callable[[List[TenderJob]], None], workers: int, batch_size: int = 1):
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.lock = threading.Lock()
+
+    def take_batch(self, inbox: queue.Queue) -> List[TenderJob]:
+        first = inbox.get()
+        if first is DONE:
+            inbox.put(DONE)
+            return []
+        jobs = [first]
+        while len(jobs) < self.batch_size:
+            try:
+                job = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if job is DONE:
+                inbox.put(DONE)
+                break
+            jobs.append(job)
+        return jobs
+
+    def run(self, inbox: queue.Queue, outbox: queue.Queue, failed: List[TenderJob], remaining: List[int]):
+        while True:
+            jobs = self.take_batch(inbox)
+            if not jobs:
+                break
+            start = time.perf_counter()
+            try:
+                self.handler(jobs)
+            except Exception as e:
+                # A batch handler that raises fails every job of the batch
+                print(f"Error in {self.name} stage: {e}")
+                for job in jobs:
+                    job.error = e
+                    job.failed_stage = self.name
+            with self.lock:
+                self.processed += len(jobs)
+                self.busy_seconds += time.perf_counter() - start
+            for job in jobs:
+                if job.error:
+                    failed.append(job)
+                else:
+                    outbox.put(job)
+
+        # The last worker to finish tells the next stage there is nothing more to come
+        with self.lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            outbox.put(DONE)
+
+def run_stages(jobs: List[TenderJob], stages: List[Stage]) -> List[TenderJob]:
+    """
+    Pushes every job through the stages. Each job moves on as soon as the
+    previous stage is done with it, so all stages work at the same time.
+
+    Returns:
+        The jobs that were dropped along the way.
+    """
+    queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in range(len(stages) + 1)]
+    failed: List[TenderJob] = []
+    threads: List[threading.Thread] = []
+    for index, stage in enumerate(stages):
+        remaining = [stage.workers]
+        for worker in range(stage.workers):
+            thread = threading.Thread(
+                target=stage.run,
+                args=(queues[index], queues[index + 1], failed, remaining),
+                name=f"{stage.name}-{worker}",
+                daemon=True
+            )
+            thread.start()
+            threads.append(thread)
+
+    # Results are read off the jobs themselves, the last queue only needs draining so the final stage never blocks
+    def drain():
+        while queues[-1].get() is not DONE:
+            pass
+    drainer = threading.Thread(target=drain, daemon=True)
+    drainer.start()
+
+    for job in jobs:
+        queues[0].put(job)
+    queues[0].put(DONE)
+
+    for thread in threads:
+        thread.join()
+    drainer.join()
+
+    for stage in stages:
+        print(f"⏱️  {stage.name}: {stage.processed} tenders, {stage.busy_seconds:.1f}s busy across {stage.workers} workers")
+    return failed
+
+def run_pipeline(data: HomePageData) -> Tuple[Dict[str, dict], Dict[str, str]]:
+    """
+    Scrapes, downloads, uploads, shares and renders every tender as a stream.
+
+    Tender.details and Tender.drive_url are filled in place. Tenders whose page
+    could not be scraped or whose attachments could not be downloaded
+    are removed from their query table once everything has finished, in digest order.
+    A tender whose attachments could not be uploaded stays, without a Drive link.
+
+    Tenders that have not changed since an earlier digest keep the Drive folder
+    they got then, changed ones only download and upload their new attachments.
+
+    Returns:
+        The removed tenders keyed by tender_id (the contents of removed_tenders.json),
+        each with the query_names that listed it, and the rendered tender rows keyed by tender_id for render_email.
+    """
+    jobs: List[TenderJob] = []
+    seen = set()
+    for query_table in data.query_table:
+        for tender in query_table.tenders:
+            # The same tender can be listed under several queries, it only goes through once
+            if tender.tender_id in seen:
+                continue
+            seen.add(tender.tender_id)
+            jobs.append(TenderJob(len(jobs), query_table, tender))
+
+    date = parse_date(data.header.date)
+    # Attachments downloaded by an earlier run of the same digest are kept and not downloaded again
+    os.makedirs("tenders/" + date, exist_ok=True)
+
+    # Drive setup is done once up front
+    credentials = load_credentials()
+    service = authenticate_google_drive(credentials)
+    index, store = shared_state()
+    with date_folder_lock:
+        date_folder_id = resolve_date_folder(service, index, date) if service else None
+        if service and date_folder_id and not index.sync_date_folder(service, date, date_folder_id):
+            print("⚠️  Falling back to the last saved Drive index.")
+    if not date_folder_id:
+        print("⚠️  Google Drive is unavailable, tenders will link to the website.")
+    services = ThreadServices(credentials)
+
+    limiter = HostLimiter(SCRAPE_PER_HOST)
+    bandwidth = BandwidthLimiter(DOWNLOAD_BANDWIDTH) if DOWNLOAD_BANDWIDTH > 0 else None
+    template = compile_template()
+    # Started up front so the first scraped page does not wait for it. See parse_pool.process_context.
+    parse_pool = ParsePool() if PARSE_IN_PROCESSES else None
+    if parse_pool:
+        parse_pool.start()
+        print(f"🚀 Parsing detail pages in {parse_pool.max_workers} processes.")
+
+    def scrape(batch: List[TenderJob]):
+        job = batch[0]
+        if job.tender.details:
+            return
+        try:
+            with limiter.get(job.tender.tender_url):
+                job.tender.details = scrape_tender(job.tender.tender_url, parse_pool.parse if parse_pool else None)
+        except Exception as e:
+            job.error = e
+            job.failed_stage = "scrape"
+
+    def download(batch: List[TenderJob]):
+        job = batch[0]
+        if not date_folder_id:
+            return
+        job.claim = tender_locks.get(job.tender.tender_id)
+        job.claim.acquire()
+        try:
+            download_attachments(job)
+        finally:
+            # Held on into the upload stage only when there is something to upload
+            if job.error or job.uploaded or not job.folder_path:
+                job.release()
+
+    def download_attachments(job: TenderJob):
+        tender_id = job.tender.tender_id
+        files = job.tender.details.other_detail.files if job.tender.details else []
+        folder = store.unchanged_folder(job.tender)
+        if folder:
+            print(f"Tender '{tender_id}' has not changed since it was uploaded. Reusing its Drive folder.")
+            job.folder = folder
+            job.uploaded = True
+            return
+        state = store.get(tender_id)
+        if state and state.folder:
+            # Changed since it was uploaded: its new attachments go into the same folder
+            job.folder = state.folder
+            job.attachments = store.missing_attachments(job.tender)
+            job.replaced = {file.file_name for file in state.attachments} & {file.file_name for file in job.attachments}
+            print(f"Tender '{tender_id}' has changed, {len(job.attachments)}/{len(files)} attachments are new.")
+        else:
+            folder = index.get_tender(date, tender_id)
+            if folder and folder.file_count > 0:
+                print(f"Folder '{tender_id}' already exists and is not empty. Skipping download.")
+                job.folder = folder
+                job.uploaded = True
+                job.uploaded_files = list(files)
+                return
+            job.folder = folder
+            job.attachments = list(files)
+        job.folder_path = "tenders/" + date + "/" + tender_id
+        os.makedirs(job.folder_path, exist_ok=True)
+        for file in job.attachments:
+            file_path = job.folder_path + "/" + file.file_name
+            if file.file_name in job.replaced and os.path.exists(file_path):
+                # Same name as an attachment that has changed, the local copy is stale
+                os.remove(file_path)
+            error = download_one((file, file_path), bandwidth)
+            if error:
+                job.error = error
+                job.failed_stage = "download"
+                return
+
+    def upload(batch: List[TenderJob]):
+        job = batch[0]
+        if not date_folder_id or job.uploaded or not job.folder_path:
+            return
+        try:
+            upload_attachments(job)
+        finally:
+            job.release()
+
+    def upload_attachments(job: TenderJob):
+        drive_service = services.get()
+        try:
+            if not job.folder:
+                response = drive_service.files().create(body={
+                    'name': job.tender.tender_id,
+                    'mimeType': 'application/vnd.google-apps.folder',
+                    'parents': [date_folder_id]
+                }, fields='id, webViewLink').execute()
+                job.folder = DriveTenderFolder(id=response['id'], file_count=0, web_view_link=response.get('webViewLink'))
+            for file in job.attachments:
+                # A changed attachment overwrites its old version instead of sitting next to it
+                file_id = find_file(drive_service, file.file_name, job.folder.id) if file.file_name in job.replaced else None
+                upload_file(drive_service, job.folder_path + "/" + file.file_name, job.folder.id, file_id)
+                if not file_id:
+                    job.folder.file_count += 1
+                job.uploaded_files.append(file)
+        except Exception as e:
+            # Kept in the digest without a Drive link. Its partly filled folder is not put in
+            # the index, the store remembers what made it in so the next run uploads the rest.
+            print(f"Error uploading tender '{job.tender.tender_id}': {e}")
+            if job.folder:
+                store.record(job.tender, date, job.folder, job.uploaded_files)
+            job.folder = None
+            return
+        state = store.get(job.tender.tender_id)
+        # A folder reused from an earlier digest lives under that digest's date folder
+        if job.folder and not (state and state.folder and state.folder.id == job.folder.id and state.date != date):
+            index.record_tender(date, job.tender.tender_id, job.folder)
+        # Before the tender is unlocked, a digest waiting for it must find what was uploaded
+        store.record(job.tender, date, job.folder, job.uploaded_files)
+
+    def link(batch: List[TenderJob]):
+        # Batched stage: one permission batch request for every tender waiting here
+        with_folder = {job.tender.tender_id: job.folder for job in batch if job.folder}
+        if not with_folder:
+            return
+        links = share_folders(services.get(), with_folder)
+        for job in batch:
+            if job.tender.tender_id in links:
+                job.tender.drive_url = links[job.tender.tender_id]
+            if job.folder:
+                store.record(job.tender, date, job.folder, job.uploaded_files)
+
+    def render(batch: List[TenderJob]):
+        job = batch[0]
+        job.row = render_tender_row_html(job.tender, template)
+
+    stages = [
+        Stage("scrape", scrape, SCRAPE_WORKERS),
+        Stage("download", download, DOWNLOAD_WORKERS),
+        Stage("upload", upload, DRIVE_UPLOAD_WORKERS),
+        Stage("link", link, PIPELINE_LINK_WORKERS, batch_size=DRIVE_BATCH_SIZE),
+        Stage("render", render, PIPELINE_RENDER_WORKERS),
+    ]
+    try:
+        failed = run_stages(jobs, stages)
+    finally:
+        for job in jobs:
+            job.release()
+        index.save()
+        store.save()
+        if parse_pool:
+            parse_pool.shutdown()
+
+    # Report and remove failures in digest order, whatever order they finished in
+    failed.sort(key=lambda job: job.position)
+    removed_tenders: Dict[str, dict] = {}
+    failed_ids = set()
+    for job in failed:
+        print(f"Error ({job.failed_stage}): {job.error}")
+        failed_ids.add(job.tender.tender_id)
+        if job.failed_stage == "scrape":
+            removed_tenders[job.tender.tender_id] = job.tender.model_dump(mode="json")
+            # The queries that listed it, they are gone once it leaves their tables
+            removed_tenders[job.tender.tender_id]["query_names"] = [
+                query_table.query_name for query_table in data.query_table
+                if any(tender.tender_id == job.tender.tender_id for tender in query_table.tenders)
+            ]
+    for query_table in data.query_table:
+        query_table.tenders = [tender for tender in query_table.tenders if tender.tender_id not in failed_ids]
+
+    # Duplicates of a tender listed under several queries share its results
+    by_id = {job.tender.tender_id: job.tender for job in jobs}
+    for query_table in data.query_table:
+        for tender in query_table.tenders:
+            original = by_id[tender.tender_id]
+            if tender is not original:
+                tender.details = original.details
+                tender.drive_url = original.drive_url
+
+    rendered_rows = {job.tender.tender_id: job.row for job in jobs if job.row is not None and job.tender.tender_id not in failed_ids}
+    return removed_tenders, rendered_rows
@@ -0,0 +1,64 @@
+from bs4.element import Tag
+from typing import Dict, List
+
+import functools
+import re
+
+# Value used for a field whose label is not in the table
+MISSING_VALUE = "N/A"
+
+# Declarative description of a label/value table: model field -> accepted labels.
+# The first label is the one the site uses today, the others are aliases.
+FieldSpec = Dict[str, List[str]]
+
+@functools.lru_cache(maxsize=1024)
+def normalize_label(label: str) -> str:
+    """Lowercases a label and reduces it to words, so "Tender No. :" and "tender no" match."""
+    return " ".join(re.findall(r"[a-z0-9]+", label.lower()))
+
+def build_row_index(table: Tag, skip_rows: int = 1) -> Dict[str, str]:
+    """
+    Reads a two column label/value table in a single pass.
+
+    Every row's label and value text is extracted exactly once. The first row
+    is the table name and is skipped. When a label repeats, the first row wins.
+
+    Returns:
+        normalized label -> raw value text, in row order.
+    """
+    index: Dict[str, str] = {}
+    for row in table.find_all('tr')[skip_rows:]:
+        cells = row.find_all('td', limit=2)
+        if len(cells) < 2:
+            continue
+        label = normalize_label(cells[0].text)
+        if label and label not in index:
+            index[label] = cells[1].text
+    return index
+
+def lookup(index: Dict[str, str], labels: List[str]) -> str:
+    """
+    Finds the value for the first matching label. In order of preference:
+    an exact match on any alias, a match ignoring spaces (so "E.M.D" finds "EMD"),
+    then the first row whose label contains one of the aliases as whole words.
+    """
+    normalized = [normalize_label(label) for label in labels]
+    for label in normalized:
+        if label in index:
+            return index[label]
+
+    compact = [label.replace(" ", "") for label in normalized]
+    for row_label, value in index.items():
+        if row_label.replace(" ", "") in compact:
+            return value
+
+    for row_label, value in index.items():
+        padded = f" {row_label} "
+        if any(f" {label} " in padded for label in normalized):
+            return value
+    return MISSING_VALUE
+
+def extract_fields(table: Tag, spec: FieldSpec) -> Dict[str, str]:
+    """Maps a label/value table onto model fields, e.g. TenderDetailNotice(**extract_fields(table, NOTICE_FIELDS))."""
+    index = build_row_index(table)
+    return {field: lookup(index, labels) for field, labels in spec.items()}
@@ -1,8 +1,11 @@
 from bs4 import BeautifulSoup
+from bs4.element import Tag
+from typing import Dict, Optional
 import copy
 import premailer
 
-from data_models import HomePageData
+from compiled_template import apply_inline_styles
+from data_models import HomePageData, Tender
 
 p = premailer.Premailer(
         allow_loading_external_files=True
@@ -133,9 +136,60 @@ def reformat_page(soup: BeautifulSoup) -> BeautifulSoup:
     return soup
 
 
-def generate_email(data: HomePageData) -> BeautifulSoup:
+def render_tender_row(tender_table: Tag, tender_data: Tender) -> Tag:
+    """
+    Copies the tender row of the template and fills it with one tender.
+    Pure function of its inputs, so rows can be rendered ahead of time (see pipeline.py).
+    """
+    new_tender_table = copy.copy(tender_table)
+    if not new_tender_table:
+        raise Exception("New tender table not found")
+    # Classes available in new_tender_table:
+    #   tender_table_tender_name_and_number
+    #   tender_table_tender_city
+    #   tender_table_tender_summary
+    #   tender_table_tender_value
+    #   tender_table_tender_due_date
+    #   tender_table_view_tender_link
+    tender_table_tender_name_and_number = new_tender_table.find('td', attrs={'class': 'tender_table_tender_name_and_number'})
+    if not tender_table_tender_name_and_number:
+        raise Exception("Tender table tender name and number not found")
+    tender_table_tender_name_and_number.string = tender_data.tender_name
+    tender_table_tender_city = new_tender_table.find('td', attrs={'class': 'tender_table_tender_city'})
+    if not tender_table_tender_city:
+        raise Exception("Tender table tender city not found")
+    tender_table_tender_city.string = tender_data.city
+    tender_table_tender_summary = new_tender_table.find('td', attrs={'class': 'tender_table_tender_summary'})
+    if not tender_table_tender_summary:
+        raise Exception("Tender table tender summary not found")
+    tender_table_tender_summary.string = tender_data.summary
+    tender_table_tender_value = new_tender_table.find('span', attrs={'class': 'tender_table_tender_value'})
+    if not tender_table_tender_value:
+        raise Exception("Tender table tender value not found")
+    tender_table_tender_value.string = tender_data.value
+    tender_table_tender_due_date = new_tender_table.find('span', attrs={'class': 'tender_table_tender_due_date'})
+    if not tender_table_tender_due_date:
+        raise Exception("Tender table tender due date not found")
+    tender_table_tender_due_date.string = tender_data.due_date
+    tender_table_view_tender_link = new_tender_table.find('a', attrs={'class': 'tender_table_view_tender_link'})
+    if not tender_table_view_tender_link:
+        raise Exception("Tender table view tender link not found")
+    tender_table_view_tender_link['href'] = tender_data.drive_url or tender_data.tender_url
+    tender_table_redirect_to_website = new_tender_table.find('a', attrs={'class': 'tender_table_redirect_to_website'})
+    if not tender_table_redirect_to_website:
+        raise Exception("Tender table redirect to website not found")
+    tender_table_redirect_to_website['href'] = f"http://3.6.93.207:3000/new-from-drive?driveUrl={tender_data.drive_url}"
+
+    return new_tender_table
+
+
+def generate_email(data: HomePageData, rendered_rows: Optional[Dict[str, Tag]] = None, use_style_map: bool = True) -> BeautifulSoup:
     """
     Generates an email HTML string from a HomePageData object.
+
+    rendered_rows can hold tender rows already rendered with render_tender_row,
+    keyed by tender_id. Tenders without one are rendered here.
+    use_style_map=False always inlines the CSS with premailer, see compiled_template.apply_inline_styles.
     """
     # Import the exsiting HTML template
     with open('./template.html', 'r') as f:
@@ -226,45 +280,9 @@ def generate_email(data: HomePageData) -> BeautifulSoup:
         if not tender_table:
             raise Exception("Tender table not found")
         for tender_data in query.tenders:
-            new_tender_table = copy.copy(tender_table)
-            if not new_tender_table:
-                raise Exception("New tender table not found")
-            # Classes available in new_tender_table:
-            #   tender_table_tender_name_and_number
-            #   tender_table_tender_city
-            #   tender_table_tender_summary
-            #   tender_table_tender_value
-            #   tender_table_tender_due_date
-            #   tender_table_view_tender_link
-            tender_table_tender_name_and_number = new_tender_table.find('td', attrs={'class': 'tender_table_tender_name_and_number'})
-            if not tender_table_tender_name_and_number:
-                raise Exception("Tender table tender name and number not found")
-            tender_table_tender_name_and_number.string = tender_data.tender_name
-            tender_table_tender_city = new_tender_table.find('td', attrs={'class': 'tender_table_tender_city'})
-            if not tender_table_tender_city:
-                raise Exception("Tender table tender city not found")
-            tender_table_tender_city.string = tender_data.city
-            tender_table_tender_summary = new_tender_table.find('td', attrs={'class': 'tender_table_tender_summary'})
-            if not tender_table_tender_summary:
-                raise Exception("Tender table tender summary not found")
-            tender_table_tender_summary.string = tender_data.summary
-            tender_table_tender_value = new_tender_table.find('span', attrs={'class': 'tender_table_tender_value'})
-            if not tender_table_tender_value:
-                raise Exception("Tender table tender value not found")
-            tender_table_tender_value.string = tender_data.value
-            tender_table_tender_due_date = new_tender_table.find('span', attrs={'class': 'tender_table_tender_due_date'})
-            if not tender_table_tender_due_date:
-                raise Exception("Tender table tender due date not found")
-            tender_table_tender_due_date.string = tender_data.due_date
-            tender_table_view_tender_link = new_tender_table.find('a', attrs={'class': 'tender_table_view_tender_link'})
-            if not tender_table_view_tender_link:
-                raise Exception("Tender table view tender link not found")
-            tender_table_view_tender_link['href'] = tender_data.drive_url or tender_data.tender_url
-            tender_table_redirect_to_website = new_tender_table.find('a', attrs={'class': 'tender_table_redirect_to_website'})
-            if not tender_table_redirect_to_website:
-                raise Exception("Tender table redirect to website not found")
-            tender_table_redirect_to_website['href'] = f"http://3.6.93.207:3000/new-from-drive?driveUrl={tender_data.drive_url}"
-
+            new_tender_table = rendered_rows.pop(tender_data.tender_id, None) if rendered_rows else None
+            if new_tender_table is None:
+                new_tender_table = render_tender_row(tender_table, tender_data)
             tender_query_table_body.append(new_tender_table)
 
         tender_table.decompose()
@@ -273,6 +291,10 @@ def generate_email(data: HomePageData) -> BeautifulSoup:
 
     tenders_table_elem.decompose()
 
+    # The template's own markup is inlined from the cached style map, premailer only runs for anything else
+    if use_style_map and apply_inline_styles(soup):
+        return soup
+
     transformed = p.transform(soup.prettify())
 
     return BeautifulSoup(transformed, 'html.parser')
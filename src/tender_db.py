@@ -0,0 +1,462 @@
+from dotenv import load_dotenv
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Dict, Iterable, List, Optional, Set
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from data_models import (
+    HomePageData,
+    HomePageHeader,
+    Tender,
+    TenderDetailContactInformation,
+    TenderDetailDetails,
+    TenderDetailKeyDates,
+    TenderDetailNotice,
+    TenderDetailOtherDetail,
+    TenderDetailPage,
+    TenderDetailPageFile,
+)
+from drive import parse_date
+from field_parsers import clean_text
+
+load_dotenv()
+
+# --- Configuration ---
+TENDER_DB_PATH = os.getenv("TENDER_DB_PATH") or "tenders.db"
+# SQLite allows at most 999 parameters per statement in older builds
+MAX_PARAMETERS = 500
+
+# Sections of TenderDetailPage stored as the columns of tender_details
+DETAIL_SECTIONS = [
+    ("notice", TenderDetailNotice),
+    ("details", TenderDetailDetails),
+    ("key_dates", TenderDetailKeyDates),
+    ("contact_information", TenderDetailContactInformation),
+]
+# Notice fields whose name is already a column of tender_details, see also parquet_export
+RENAMED_NOTICE_FIELDS = {"tender_id": "notice_tender_id"}
+
+def sql_type(model, field: str) -> str:
+    """Column type of a model field: the typed fields are nullable, see field_parsers."""
+    annotation = model.model_fields[field].annotation
+    if annotation == Optional[int]:
+        return "INTEGER"
+    if annotation == Optional[datetime]:
+        # ISO 8601, which sorts like the dates it holds
+        return "TEXT"
+    return "TEXT NOT NULL"
+
+def sql_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def cleaned_value(value):
+    return clean_text(value) if isinstance(value, str) else sql_value(value)
+
+def detail_columns() -> List[tuple]:
+    """(section, field, column) for every field of a TenderDetailPage stored in tender_details."""
+    columns = []
+    for section, model in DETAIL_SECTIONS:
+        for field in model.model_fields:
+            column = RENAMED_NOTICE_FIELDS.get(field, field) if section == "notice" else field
+            columns.append((section, field, column))
+    return columns
+
+DETAIL_COLUMNS = detail_columns()
+# The model of every entry of DETAIL_COLUMNS
+DETAIL_MODELS = [dict(DETAIL_SECTIONS)[section] for section, _, _ in DETAIL_COLUMNS]
+TENDER_COLUMNS = ["tender_id", "tender_name", "tender_url", "drive_url", "city", "summary", "value", "due_date", "value_rupees", "due_at"]
+# Stored with their whitespace collapsed, so they can be searched for as they read
+CLEANED_TENDER_COLUMNS = {"tender_id", "tender_name", "city", "summary", "value", "due_date"}
+# Every table keyed by tender_id
+TENDER_ID_TABLES = ["tenders", "tender_details", "tender_files", "digest_tenders"]
+
+TABLES = f"""
+CREATE TABLE IF NOT EXISTS digests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    link TEXT,
+    digest_date TEXT,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    contact TEXT NOT NULL,
+    no_of_new_tenders TEXT NOT NULL,
+    company TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tenders (
+    tender_id TEXT PRIMARY KEY,
+    tender_name TEXT NOT NULL,
+    tender_url TEXT NOT NULL,
+    drive_url TEXT,
+    city TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    value TEXT NOT NULL,
+    due_date TEXT NOT NULL,
+    value_rupees INTEGER,
+    due_at TEXT,
+    -- The day of due_at, YYYY-MM-DD
+    due_on TEXT,
+    first_digest_id INTEGER NOT NULL REFERENCES digests (id),
+    last_digest_id INTEGER NOT NULL REFERENCES digests (id)
+);
+CREATE TABLE IF NOT EXISTS digest_tenders (
+    digest_id INTEGER NOT NULL REFERENCES digests (id),
+    query_name TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    tender_id TEXT NOT NULL REFERENCES tenders (tender_id),
+    -- 1 when the tender was dropped from the digest (removed_tenders.json)
+    removed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (digest_id, query_name, tender_id)
+);
+CREATE TABLE IF NOT EXISTS tender_details (
+    tender_id TEXT PRIMARY KEY REFERENCES tenders (tender_id),
+    {", ".join(f"{column} {sql_type(model, field)}" for (_, field, column), model in zip(DETAIL_COLUMNS, DETAIL_MODELS))},
+    information_source TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tender_files (
+    tender_id TEXT NOT NULL REFERENCES tenders (tender_id),
+    position INTEGER NOT NULL,
+    file_name TEXT NOT NULL,
+    file_url TEXT NOT NULL,
+    file_description TEXT NOT NULL,
+    file_size TEXT NOT NULL,
+    PRIMARY KEY (tender_id, position)
+);
+"""
+INDEXES = """
+CREATE INDEX IF NOT EXISTS tenders_value_rupees ON tenders (value_rupees);
+CREATE INDEX IF NOT EXISTS tenders_due_on ON tenders (due_on);
+CREATE INDEX IF NOT EXISTS tenders_city ON tenders (city);
+CREATE INDEX IF NOT EXISTS digest_tenders_query_name ON digest_tenders (query_name, tender_id);
+CREATE INDEX IF NOT EXISTS digest_tenders_tender_id ON digest_tenders (tender_id);
+CREATE INDEX IF NOT EXISTS tender_details_state_city ON tender_details (state, city);
+"""
+
+class DigestRun(BaseModel):
+    id: int
+    link: Optional[str]
+    digest_date: Optional[str]
+    header: HomePageHeader
+    scraped_at: float
+    tender_count: int
+
+def iso_date(date_string: str) -> Optional[str]:
+    date = parse_date(date_string.strip())
+    return None if date == "unknown-date" else date
+
+def chunks(items: List[str], size: int = MAX_PARAMETERS) -> Iterable[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+class TenderDatabase:
+    """
+    Every digest and every tender ever scraped, in a SQLite database.
+
+    A digest is written with bulk inserts in a single transaction, so a
+    digest is either fully in the database or not at all. A tender listed by
+    several digests has one row, updated to what the latest digest said.
+    """
+    def __init__(self, path: str = TENDER_DB_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(TABLES)
+        self.add_missing_columns()
+        self.clean_stored_text()
+        self.connection.executescript(INDEXES)
+
+    def add_missing_columns(self):
+        """Adds the columns of fields that were added to the models after the database was created."""
+        expected = {
+            "tenders": [(column, sql_type(Tender, column)) for column in TENDER_COLUMNS] + [("due_on", "TEXT")],
+            "tender_details": [(column, sql_type(model, field)) for (_, field, column), model in zip(DETAIL_COLUMNS, DETAIL_MODELS)],
+        }
+        for table, columns in expected.items():
+            existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+            for column, column_type in columns:
+                if column not in existing:
+                    # Rows written before have no value for it
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type.replace(' NOT NULL', '')}")
+
+    def clean_stored_text(self):
+        """Collapses the whitespace of the text columns written before save_digest did it. Runs once per database."""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= 2:
+            return
+        self.connection.create_function("clean_text", 1, clean_text, deterministic=True)
+        # Version 1 cleaned the text columns, version 2 the tender ids that key every table
+        text_columns = [(table, "tender_id") for table in TENDER_ID_TABLES]
+        if version < 1:
+            text_columns += self.text_columns()
+        self.connection.execute("BEGIN")
+        try:
+            # The tender ids of the tables that reference tenders only match again once all of them are cleaned
+            self.connection.execute("PRAGMA defer_foreign_keys = ON")
+            for table, column in text_columns:
+                self.connection.execute(f"UPDATE OR REPLACE {table} SET {column} = clean_text({column}) WHERE {column} IS NOT clean_text({column})")
+            self.connection.execute("PRAGMA user_version = 2")
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def text_columns(self) -> List[tuple]:
+        """(table, column) of every text column save_digest cleans, other than tender_id."""
+        return [
+            ("tenders", column) for column in TENDER_COLUMNS if column in CLEANED_TENDER_COLUMNS and column != "tender_id"
+        ] + [
+            ("tender_details", column) for (_, field, column), model in zip(DETAIL_COLUMNS, DETAIL_MODELS) if sql_type(model, field) == "TEXT NOT NULL"
+        ] + [("digest_tenders", "query_name")] + [
+            ("digests", column) for column in ["date", "name", "contact", "no_of_new_tenders", "company"]
+        ]
+
+    def save_digest(self, data: HomePageData, removed_tenders: Optional[Dict[str, dict]] = None, link: Optional[str] = None) -> int:
+        """
+        Writes a digest, its tenders, their details and files. Text is stored with
+        its whitespace collapsed, the site pads its cells with newlines and indentation.
+
+        Args:
+            removed_tenders: Tenders dropped from the digest, keyed by tender_id, as
+                returned by run_pipeline. They are stored too, marked as removed and
+                listed under their query_names.
+
+        Returns:
+            The id of the digest run.
+        """
+        removed_tenders = removed_tenders or {}
+        header = data.header
+        # (query_name, position, tender_id, removed) for every listing of the digest
+        listings: List[tuple] = []
+        tenders: Dict[str, Tender] = {}
+        for query in data.query_table:
+            for position, tender in enumerate(query.tenders):
+                listings.append((clean_text(query.query_name), position, clean_text(tender.tender_id), 0))
+                tenders[clean_text(tender.tender_id)] = tender
+        # Removed tenders are no longer in their query table, they carry the names of the queries that listed them
+        for position, (tender_id, removed) in enumerate(removed_tenders.items()):
+            tender_id = clean_text(tender_id)
+            tenders.setdefault(tender_id, Tender.model_validate(removed))
+            for query_name in removed.get("query_names") or [""]:
+                listings.append((clean_text(query_name), position, tender_id, 1))
+
+        tender_rows = [
+            [cleaned_value(getattr(tender, column)) if column in CLEANED_TENDER_COLUMNS else sql_value(getattr(tender, column)) for column in TENDER_COLUMNS] + [tender.due_at.strftime("%Y-%m-%d") if tender.due_at else None]
+            for tender in tenders.values()
+        ]
+        with_details = [tender for tender in tenders.values() if tender.details]
+        detail_rows = [
+            [clean_text(tender.tender_id)]
+            + [cleaned_value(getattr(getattr(tender.details, section), field)) for section, field, _ in DETAIL_COLUMNS]
+            + [tender.details.other_detail.information_source]
+            for tender in with_details
+        ]
+        file_rows = [
+            (clean_text(tender.tender_id), position, file.file_name, file.file_url, file.file_description, file.file_size)
+            for tender in with_details
+            for position, file in enumerate(tender.details.other_detail.files)
+        ]
+
+        detail_names = ["tender_id"] + [column for _, _, column in DETAIL_COLUMNS] + ["information_source"]
+        tender_names = TENDER_COLUMNS + ["due_on"]
+        with self.lock:
+            cursor = self.connection.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute(
+                    "INSERT INTO digests (link, digest_date, date, name, contact, no_of_new_tenders, company, scraped_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (link, iso_date(header.date), *(clean_text(value) for value in (header.date, header.name, header.contact, header.no_of_new_tenders, header.company)), time.time())
+                )
+                digest_id = cursor.lastrowid
+                cursor.executemany(
+                    f"INSERT INTO tenders ({', '.join(tender_names)}, first_digest_id, last_digest_id) "
+                    f"VALUES ({', '.join('?' * len(tender_names))}, {digest_id}, {digest_id}) "
+                    f"ON CONFLICT (tender_id) DO UPDATE SET "
+                    # A removed tender carries no drive_url, keep the one it had
+                    + ", ".join(f"{name} = excluded.{name}" for name in tender_names[1:] if name != "drive_url")
+                    + ", drive_url = COALESCE(excluded.drive_url, drive_url), last_digest_id = excluded.last_digest_id",
+                    tender_rows
+                )
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO tender_details ({', '.join(detail_names)}) VALUES ({', '.join('?' * len(detail_names))})",
+                    detail_rows
+                )
+                # The attachments of a tender are replaced as a whole
+                cursor.executemany("DELETE FROM tender_files WHERE tender_id = ?", [(clean_text(tender.tender_id),) for tender in with_details])
+                cursor.executemany("INSERT INTO tender_files VALUES (?, ?, ?, ?, ?, ?)", file_rows)
+                cursor.executemany(
+                    f"INSERT OR IGNORE INTO digest_tenders (digest_id, query_name, position, tender_id, removed) VALUES ({digest_id}, ?, ?, ?, ?)",
+                    listings
+                )
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+        print(f"🗄️  Saved digest {digest_id} with {len(tenders)} tenders to {self.path}.")
+        return digest_id
+
+    def load_tenders(self, tender_ids: List[str]) -> Dict[str, Tender]:
+        """Tenders with their details and files, keyed by tender_id (whitespace collapsed). Unknown ids are left out."""
+        tenders: Dict[str, Tender] = {}
+        if not tender_ids:
+            return tenders
+        tender_ids = [clean_text(tender_id) for tender_id in tender_ids]
+        detail_names = [column for _, _, column in DETAIL_COLUMNS]
+        with self.lock:
+            for chunk in chunks(list(dict.fromkeys(tender_ids))):
+                marks = ", ".join("?" * len(chunk))
+                rows = self.connection.execute(f"SELECT {', '.join(TENDER_COLUMNS)} FROM tenders WHERE tender_id IN ({marks})", chunk).fetchall()
+                details = {
+                    row[0]: row[1:]
+                    for row in self.connection.execute(
+                        f"SELECT tender_id, {', '.join(detail_names)}, information_source FROM tender_details WHERE tender_id IN ({marks})", chunk
+                    )
+                }
+                files: Dict[str, List[TenderDetailPageFile]] = {}
+                for row in self.connection.execute(
+                    f"SELECT tender_id, file_name, file_url, file_description, file_size FROM tender_files WHERE tender_id IN ({marks}) ORDER BY tender_id, position", chunk
+                ):
+                    files.setdefault(row[0], []).append(TenderDetailPageFile(file_name=row[1], file_url=row[2], file_description=row[3], file_size=row[4]))
+                for row in rows:
+                    tender_id = row[0]
+                    tenders[tender_id] = Tender(
+                        **dict(zip(TENDER_COLUMNS, row)),
+                        details=self.build_details(details[tender_id], files.get(tender_id, [])) if tender_id in details else None
+                    )
+        # In the order they were asked for
+        return {tender_id: tenders[tender_id] for tender_id in tender_ids if tender_id in tenders}
+
+    def build_details(self, row: tuple, files: List[TenderDetailPageFile]) -> TenderDetailPage:
+        sections: Dict[str, dict] = {section: {} for section, _ in DETAIL_SECTIONS}
+        for (section, field, _), value in zip(DETAIL_COLUMNS, row):
+            sections[section][field] = value
+        return TenderDetailPage(
+            notice=TenderDetailNotice(**sections["notice"]),
+            details=TenderDetailDetails(**sections["details"]),
+            key_dates=TenderDetailKeyDates(**sections["key_dates"]),
+            contact_information=TenderDetailContactInformation(**sections["contact_information"]),
+            other_detail=TenderDetailOtherDetail(information_source=row[-1], files=files)
+        )
+
+    def get(self, tender_id: str) -> Optional[Tender]:
+        return self.load_tenders([tender_id]).get(clean_text(tender_id))
+
+    def known_tender_ids(self, tender_ids: List[str]) -> Set[str]:
+        """The ids of the list that are already in the database."""
+        known: Set[str] = set()
+        with self.lock:
+            for chunk in chunks([clean_text(tender_id) for tender_id in tender_ids]):
+                rows = self.connection.execute(
+                    f"SELECT tender_id FROM tenders WHERE tender_id IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                known.update(row[0] for row in rows)
+        return known
+
+    def search(
+        self,
+        state: Optional[str] = None,
+        city: Optional[str] = None,
+        query_name: Optional[str] = None,
+        due_from: Optional[str] = None,
+        due_to: Optional[str] = None,
+        min_value: Optional[int] = None,
+        max_value: Optional[int] = None,
+        text: Optional[str] = None,
+        limit: int = 100
+    ) -> List[Tender]:
+        """
+        Searches every tender ever scraped, soonest due date first.
+
+        Args:
+            state, city: Exact match, on the detail page's state and on the digest's city.
+            query_name: Tenders listed at least once under this query.
+            due_from, due_to: Inclusive YYYY-MM-DD bounds on the due date.
+            min_value, max_value: Inclusive bounds in rupees on the value of the tender.
+            text: Case insensitive substring of the name or the summary.
+        """
+        conditions: List[str] = []
+        params: List[object] = []
+        # Matched against the stored values, whose whitespace is collapsed
+        state, city, query_name, text = (clean_text(value) if value else value for value in (state, city, query_name, text))
+        if state:
+            conditions.append("tender_id IN (SELECT tender_id FROM tender_details WHERE state = ?)")
+            params.append(state)
+        if city:
+            conditions.append("city = ?")
+            params.append(city)
+        if query_name:
+            conditions.append("tender_id IN (SELECT tender_id FROM digest_tenders WHERE query_name = ?)")
+            params.append(query_name)
+        if due_from:
+            conditions.append("due_on >= ?")
+            params.append(due_from)
+        if due_to:
+            conditions.append("due_on <= ?")
+            params.append(due_to)
+        if min_value is not None:
+            conditions.append("value_rupees >= ?")
+            params.append(int(min_value))
+        if max_value is not None:
+            conditions.append("value_rupees <= ?")
+            params.append(int(max_value))
+        if text:
+            conditions.append("(tender_name LIKE ? OR summary LIKE ?)")
+            params += [f"%{text}%", f"%{text}%"]
+        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT tender_id FROM tenders {where} ORDER BY due_on IS NULL, due_on, tender_id LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        return list(self.load_tenders([row[0] for row in rows]).values())
+
+    def digests(self, limit: int = 30) -> List[DigestRun]:
+        """The most recent digest runs, newest first."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT id, link, digest_date, date, name, contact, no_of_new_tenders, company, scraped_at, "
+                "(SELECT COUNT(DISTINCT tender_id) FROM digest_tenders WHERE digest_id = digests.id) "
+                "FROM digests ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            DigestRun(
+                id=row[0],
+                link=row[1],
+                digest_date=row[2],
+                header=HomePageHeader(date=row[3], name=row[4], contact=row[5], no_of_new_tenders=row[6], company=row[7]),
+                scraped_at=row[8],
+                tender_count=row[9]
+            )
+            for row in rows
+        ]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+def main():
+    # python tender_db.py digests | get <tender_id> | search [state=..] [city=..] [query_name=..] [due_from=..] [due_to=..] [min_value=..] [max_value=..] [text=..]
+    args = sys.argv[1:]
+    database = TenderDatabase()
+    if args and args[0] == "digests":
+        for digest in database.digests():
+            print(f"{digest.id:>5}  {digest.digest_date or digest.header.date:<12} {digest.tender_count:>4} tenders  {digest.link or ''}")
+    elif len(args) == 2 and args[0] == "get":
+        tender = database.get(args[1])
+        print(tender.model_dump_json(indent=2) if tender else f"No tender {args[1]}")
+    elif args and args[0] == "search":
+        filters = dict(arg.split("=", 1) for arg in args[1:])
+        for tender in database.search(**filters):
+            print(f"{tender.tender_id:>10}  {tender.due_date.strip():<12} {tender.city:<20} {tender.tender_name[:80]}")
+    else:
+        print("Usage: python tender_db.py digests | get <tender_id> | search [state=..] [city=..] [query_name=..] [due_from=..] [due_to=..] [min_value=..] [max_value=..] [text=..]")
+    database.close()
+
+if __name__ == '__main__':
+    main()
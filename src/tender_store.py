@@ -0,0 +1,123 @@
+from dotenv import load_dotenv
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+import hashlib
+import os
+import threading
+import time
+
+from data_models import Tender, TenderDetailPage, TenderDetailPageFile
+from drive_index import DriveTenderFolder
+
+load_dotenv()
+
+# --- Configuration ---
+TENDER_STATE_PATH = os.getenv("TENDER_STATE_PATH") or "tender_state.json"
+
+class TenderState(BaseModel):
+    """What was done for a tender the last time a digest listed it."""
+    tender_url: str
+    # sha256 of the scraped details, see details_hash
+    details_hash: str
+    # The attachments that are in `folder` on Drive
+    attachments: List[TenderDetailPageFile]
+    # Digest date whose Drive folder holds the tender folder
+    date: Optional[str] = None
+    folder: Optional[DriveTenderFolder] = None
+    updated_at: float
+
+class TenderStoreData(BaseModel):
+    tenders: Dict[str, TenderState]
+
+def details_hash(details: TenderDetailPage) -> str:
+    return hashlib.sha256(details.model_dump_json().encode()).hexdigest()
+
+def attachment_key(file: TenderDetailPageFile) -> tuple:
+    return (file.file_name, file.file_url, file.file_size)
+
+class TenderStore:
+    """
+    Remembers every tender ever processed, keyed by tender_id, so a digest only
+    downloads and uploads what is new since the digests before it. Most tenders
+    are listed again for days; an unchanged one keeps its Drive folder and link.
+    """
+    def __init__(self, path: str = TENDER_STATE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        # Held for a whole save, so the last state dumped is the last one written
+        self.save_lock = threading.Lock()
+        self.data = TenderStoreData(tenders={})
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self.data = TenderStoreData.model_validate_json(f.read())
+            except Exception as e:
+                print(f"⚠️  Ignoring unreadable tender state {path}: {e}")
+
+    def save(self):
+        with self.save_lock:
+            with self.lock:
+                content = self.data.model_dump_json(indent=2)
+            temp_path = self.path + ".tmp"
+            with open(temp_path, 'w') as f:
+                f.write(content)
+            os.replace(temp_path, self.path)
+
+    def get(self, tender_id: str) -> Optional[TenderState]:
+        with self.lock:
+            return self.data.tenders.get(tender_id)
+
+    def unchanged_folder(self, tender: Tender) -> Optional[DriveTenderFolder]:
+        """
+        The Drive folder of a tender whose details are the same as when its
+        folder was filled, or None if the tender is new, changed, or was never
+        fully uploaded.
+        """
+        if not tender.details:
+            return None
+        state = self.get(tender.tender_id)
+        if not state or not state.folder or state.details_hash != details_hash(tender.details):
+            return None
+        if self.missing_attachments(tender):
+            return None
+        return state.folder
+
+    def missing_attachments(self, tender: Tender) -> List[TenderDetailPageFile]:
+        """The attachments of the tender that are not in its Drive folder yet. All of them for a new tender."""
+        files = tender.details.other_detail.files if tender.details else []
+        state = self.get(tender.tender_id)
+        if not state or not state.folder:
+            return list(files)
+        uploaded = {attachment_key(file) for file in state.attachments}
+        return [file for file in files if attachment_key(file) not in uploaded]
+
+    def record(self, tender: Tender, date: Optional[str], folder: Optional[DriveTenderFolder], uploaded: List[TenderDetailPageFile]):
+        """
+        Records a processed tender.
+
+        Args:
+            folder: Its Drive folder, None when Drive was unavailable.
+            uploaded: The attachments that went into `folder` during this run.
+                Attachments that were already in the same folder are kept, unless one of these has their name.
+        """
+        if not tender.details:
+            return
+        with self.lock:
+            previous = self.data.tenders.get(tender.tender_id)
+            attachments: Dict[tuple, TenderDetailPageFile] = {}
+            if previous and folder and previous.folder and previous.folder.id == folder.id:
+                # An attachment uploaded again under the same name replaced the old version
+                replaced = {file.file_name for file in uploaded}
+                attachments = {attachment_key(file): file for file in previous.attachments if file.file_name not in replaced}
+            for file in uploaded:
+                attachments[attachment_key(file)] = file
+            keep_date = previous and folder and previous.folder and previous.folder.id == folder.id
+            self.data.tenders[tender.tender_id] = TenderState(
+                tender_url=tender.tender_url,
+                details_hash=details_hash(tender.details),
+                attachments=list(attachments.values()) if folder else [],
+                date=previous.date if keep_date else date,
+                folder=folder,
+                updated_at=time.time()
+            )
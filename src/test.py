@@ -1,6 +1,13 @@
 
 import os
+from detail_page_scrape import parse_tender_page
+from bs4 import BeautifulSoup
+from compiled_template import render_email
 from drive import authenticate_google_drive, get_shareable_link, upload_folder_to_drive
+from fixtures import load_fixture_pages
+from home_page_scrape import parse_home_page
+from parser_backend import PARSER_BACKENDS
+from templater import generate_email
 
 
 def test_google_drive():
@@ -27,15 +34,70 @@ def test_upload_folder_to_drive():
     shareable_link = get_shareable_link(service, folder_id)
     print("Folder uploaded to Google Drive with ID:", shareable_link)
 
+def test_parser_parity():
+    # Every parser backend has to produce exactly the same models on every saved page
+    pages = load_fixture_pages()
+    for kind in ["home", "detail"]:
+        if not any(page_kind == kind for _, page_kind, _ in pages):
+            raise Exception(f"No saved {kind} pages found, see fixtures.py")
+
+    # The reference is a full parse, subtree parsing has to give the same result
+    failures = 0
+    for path, kind, content in pages:
+        parse = parse_home_page if kind == "home" else parse_tender_page
+        reference = parse(content, PARSER_BACKENDS[0], subtree=False)
+        for backend in PARSER_BACKENDS:
+            for subtree in [False, True]:
+                result = parse(content, backend, subtree=subtree)
+                if result != reference:
+                    failures += 1
+                    mode = "subtree" if subtree else "full"
+                    print(f"❌ {path}: {backend} ({mode}) differs from {PARSER_BACKENDS[0]} (full)")
+
+    if failures:
+        raise Exception(f"{failures} parser parity failures")
+    print(f"✅ All {len(PARSER_BACKENDS)} parser backends agree on {len(pages)} saved pages, parsed whole and by subtree.")
+
+def html_signature(html: str):
+    # Every element with its attributes in document order, and the text with whitespace collapsed
+    soup = BeautifulSoup(html, 'html.parser')
+    elements = []
+    for element in soup.find_all(True):
+        attrs = {key: " ".join(value) if isinstance(value, list) else " ".join(value.split()) for key, value in element.attrs.items()}
+        elements.append((element.name, sorted(attrs.items())))
+    return elements, " ".join(soup.get_text().split())
+
+def test_renderer_parity():
+    # The compiled template has to render the same email as generate_email
+    homes = [content for _, kind, content in load_fixture_pages() if kind == "home"]
+    if not homes:
+        raise Exception("No saved home pages found, see fixtures.py")
+
+    # The reference runs premailer on the whole email, like generate_email used to
+    for content in homes:
+        data = parse_home_page(content)
+        reference = html_signature(str(generate_email(data, use_style_map=False)))
+        if html_signature(str(generate_email(data))) != reference:
+            raise Exception("generate_email with the cached style map differs from premailer")
+        if html_signature(render_email(data)) != reference:
+            raise Exception("render_email differs from generate_email")
+    print(f"✅ render_email and the cached style map match premailer on {len(homes)} saved home pages.")
+
 def main():
     print("Choose an option to test:")
     print("1. Upload a folder to Google Drive")
     print("2. Upload a folder to Google Drive v2")
+    print("3. Parser backend parity on saved pages")
+    print("4. Compiled template and cached styles against premailer")
     choice = input("Enter your choice: ")
     if choice == "1":
         test_google_drive()
     elif choice == "2":
         test_upload_folder_to_drive()
+    elif choice == "3":
+        test_parser_parity()
+    elif choice == "4":
+        test_renderer_parity()
     else:
         print("Invalid choice.")
 